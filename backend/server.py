@@ -1,17 +1,24 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
 import os
-import aiohttp
 import logging
+import time
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, ValidationError
+from typing import Annotated, List, Literal, Optional, Dict, Any
+from typing_extensions import NotRequired, TypedDict
 import uuid
 from datetime import datetime, timezone, timedelta
 import random
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
 import hashlib
 import secrets
 import httpx
@@ -19,6 +26,8 @@ import httpx
 from passlib.context import CryptContext
 import jwt
 import asyncio
+import orjson
+from rapidfuzz import fuzz, process
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
@@ -45,6 +54,9 @@ JWT_EXPIRATION_HOURS = 168  # 7 days
 # Discord Webhook (configurable placeholder)
 DISCORD_WEBHOOK_URL = os.environ.get('DISCORD_WEBHOOK_URL', '')
 
+# Shared outbound HTTP client (keep-alive pool reused across requests, closed on shutdown)
+HTTP_CLIENT = httpx.AsyncClient(timeout=5.0, limits=httpx.Limits(max_keepalive_connections=32))
+
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -74,32 +86,32 @@ async def verify_turnstile(token: str, ip: str = None) -> dict:
         return {"success": False, "error": "No captcha token provided"}
     
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            payload = {
-                "secret": TURNSTILE_SECRET_KEY,
-                "response": token,
-            }
-            # Only add IP if provided
-            if ip:
-                payload["remoteip"] = ip
-            
-            logging.info(f"[Turnstile] Sending verification request to Cloudflare...")
-            
-            response = await client.post(
-                "https://challenges.cloudflare.com/turnstile/v0/siteverify",
-                data=payload
-            )
-            
-            result = response.json()
-            logging.info(f"[Turnstile] Cloudflare response: {result}")
-            
-            if result.get("success"):
-                logging.info("[Turnstile] Verification SUCCESS")
-                return {"success": True, "error": None}
-            else:
-                error_codes = result.get("error-codes", [])
-                logging.error(f"[Turnstile] Verification FAILED: {error_codes}")
-                return {"success": False, "error": f"Verification failed: {error_codes}"}
+        payload = {
+            "secret": TURNSTILE_SECRET_KEY,
+            "response": token,
+        }
+        # Only add IP if provided
+        if ip:
+            payload["remoteip"] = ip
+        
+        logging.info(f"[Turnstile] Sending verification request to Cloudflare...")
+        
+        response = await HTTP_CLIENT.post(
+            "https://challenges.cloudflare.com/turnstile/v0/siteverify",
+            data=payload,
+            timeout=10.0
+        )
+        
+        result = response.json()
+        logging.info(f"[Turnstile] Cloudflare response: {result}")
+        
+        if result.get("success"):
+            logging.info("[Turnstile] Verification SUCCESS")
+            return {"success": True, "error": None}
+        else:
+            error_codes = result.get("error-codes", [])
+            logging.error(f"[Turnstile] Verification FAILED: {error_codes}")
+            return {"success": False, "error": f"Verification failed: {error_codes}"}
                 
     except httpx.TimeoutException:
         logging.error("[Turnstile] Request timeout!")
@@ -113,7 +125,9 @@ app = FastAPI(
     title="Goladium API",
     description="Demo Casino Simulation Platform",
     version="0.1.0",
-    root_path="/api"
+    root_path="/api",
+    # Encode route responses with orjson instead of the stdlib json module
+    default_response_class=ORJSONResponse
 )
 
 limiter = Limiter(key_func=get_remote_address)
@@ -129,9 +143,29 @@ app.add_exception_handler(
 # Create router with /api prefix
 api_router = APIRouter()
 
+# ============== BACKGROUND TASKS ==============
+
+# Strong references to fire-and-forget tasks so they are not garbage collected mid-flight
+background_tasks: set = set()
+
+
+def _background_task_done(task: asyncio.Task):
+    background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logging.error(f"Background task failed: {task.exception()}")
+
+
+def spawn_background_task(coro) -> asyncio.Task:
+    """Run a coroutine without awaiting it (for writes the response does not depend on)"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(_background_task_done)
+    return task
+
 # ============== CHAT MODERATION SYSTEM ==============
 
 import re
+from collections import deque
 
 # Profanity blacklist (German + English common offensive words)
 PROFANITY_BLACKLIST = [
@@ -143,15 +177,21 @@ PROFANITY_BLACKLIST = [
     "whore", "slut", "asshole", "dickhead", "motherfucker"
 ]
 
-# URL/Advertising patterns
-ADVERTISING_PATTERNS = [
+PROFANITY_BLACKLIST_LOWER = tuple(word.lower() for word in PROFANITY_BLACKLIST)
+MIN_PROFANITY_LEN = min(len(word) for word in PROFANITY_BLACKLIST_LOWER)
+
+# All blacklist words in one alternation, matched anywhere in the text so compounds
+# ("bullshit", "drecksfotze") are caught just like a plain substring check
+PROFANITY_RE = re.compile("|".join(map(re.escape, PROFANITY_BLACKLIST_LOWER)), re.IGNORECASE)
+
+# URL/Advertising patterns - link patterns all need a '.' or ':' to match
+ADVERTISING_LINK_PATTERNS = [
     r'https?://',                    # http:// or https://
     r'www\.',                        # www.
     r'discord\.gg',                  # Discord invites
     r'discord\.com/invite',          # Discord invites alternative
     r't\.me/',                       # Telegram links
     r'bit\.ly',                      # URL shorteners
-    r'tinyurl',
     r'\.[a-z]{2,4}/',               # Domain patterns like .com/ .gg/ .io/
     r'\.com\b',                      # .com
     r'\.gg\b',                       # .gg
@@ -161,14 +201,35 @@ ADVERTISING_PATTERNS = [
     r'\.xyz\b',                      # .xyz
     r'\.bet\b',                      # .bet
     r'\.casino\b',                   # .casino
+]
+
+ADVERTISING_KEYWORD_PATTERNS = [
+    r'tinyurl',                      # URL shorteners
     r'ref[=\?]',                     # Referral parameters
     r'referral',                     # Referral links
     r'promo\s*code',                 # Promo codes
 ]
 
+ADVERTISING_PATTERNS = ADVERTISING_LINK_PATTERNS + ADVERTISING_KEYWORD_PATTERNS
+
+
+def compile_alternation(patterns: list) -> re.Pattern:
+    """Fuse regex patterns into one case-insensitive alternation, compiled once"""
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns), re.IGNORECASE)
+
+
+ADVERTISING_RE = compile_alternation(ADVERTISING_PATTERNS)
+ADVERTISING_KEYWORD_RE = compile_alternation(ADVERTISING_KEYWORD_PATTERNS)
+
 # Spam detection settings
 SPAM_TIME_WINDOW_SECONDS = 15  # Time window to check for repeated messages
 SPAM_SIMILARITY_THRESHOLD = 0.85  # 85% similarity = considered same message
+SPAM_RECENT_MESSAGES_LIMIT = 10  # Max recent messages compared per user
+RECENT_CHAT_CACHE_MAX_USERS = 5000  # Sweep idle users once the cache grows past this
+
+# In-process cache of recent chat messages for spam detection (single worker)
+# user_id -> deque of (monotonic timestamp, normalized message), oldest first
+recent_chat_messages: Dict[str, deque] = {}
 
 # Mute durations in seconds
 MUTE_2_MIN = 120
@@ -197,80 +258,144 @@ ADVERTISING_ESCALATION = [
     -1            # 3rd offense: permanent
 ]
 
+# Per-violation settings: offense counter, escalation table, log reasons and user messages
+VIOLATION_CONFIG = {
+    "advertising": {
+        "counter_field": "advertising_count",
+        "escalation": ADVERTISING_ESCALATION,
+        "log_message": True,
+        "mute_reason": "Advertising detected",
+        "permanent_reason": "Repeated advertising",
+        "mute_message": "You have been muted for {minutes} minutes due to unauthorized advertising.",
+        "permanent_message": "You have been permanently muted in chat due to unauthorized advertising. If you believe this was a mistake, please contact us on Discord.",
+    },
+    "profanity": {
+        "counter_field": "profanity_count",
+        "escalation": PROFANITY_ESCALATION,
+        "log_message": True,
+        "warning_reason": "First profanity offense - warning issued",
+        "mute_reason": "Profanity detected",
+        "permanent_reason": "Repeated profanity",
+        "warning_message": "That was not very nice. Please keep the chat respectful.",
+        "mute_message": "You have been muted for {minutes} minutes due to offensive language. Please keep the chat respectful.",
+        "permanent_message": "You have been permanently muted in chat due to repeated offensive language. If you believe this was a mistake, please contact us on Discord.",
+    },
+    "spam": {
+        "counter_field": "spam_count",
+        "escalation": SPAM_ESCALATION,
+        "log_message": False,
+        "mute_reason": "Spam detected",
+        "permanent_reason": "Repeated spam",
+        "mute_message": "You have been muted for {minutes} minutes due to spam. Please stop spamming.",
+        "permanent_message": "You have been permanently muted in chat due to repeated spam. If you believe this was a mistake, please contact us on Discord.",
+    },
+}
+
+
+WHITESPACE_RE = re.compile(r"\s+")
+
 
 def normalize_message(message: str) -> str:
-    """Normalize message for comparison (lowercase, trimmed, collapsed whitespace)"""
-    return ' '.join(message.lower().strip().split())
+    """Normalize message for comparison (casefolded, trimmed, collapsed whitespace)"""
+    return WHITESPACE_RE.sub(" ", message.casefold()).strip()
 
 
 def calculate_similarity(msg1: str, msg2: str) -> float:
     """Calculate similarity between two messages (0.0 to 1.0)"""
-    m1 = normalize_message(msg1)
-    m2 = normalize_message(msg2)
-    
+    return normalized_similarity(normalize_message(msg1), normalize_message(msg2))
+
+
+def normalized_similarity(m1: str, m2: str) -> float:
+    """Similarity (0.0 to 1.0) of two messages that are already normalized"""
     if m1 == m2:
         return 1.0
     
     if not m1 or not m2:
         return 0.0
     
-    # Simple character-based similarity
-    longer = m1 if len(m1) >= len(m2) else m2
-    shorter = m2 if len(m1) >= len(m2) else m1
-    
-    if len(longer) == 0:
-        return 1.0
-    
-    # Count matching characters in sequence
-    matches = 0
-    for i, char in enumerate(shorter):
-        if i < len(longer) and char == longer[i]:
-            matches += 1
-    
-    return matches / len(longer)
+    # Edit-distance based ratio - tolerant to inserted/shifted characters
+    return fuzz.ratio(m1, m2) / 100.0
 
 
-def contains_profanity(message: str) -> bool:
+def contains_profanity(message: str, normalized: str = None) -> bool:
     """Check if message contains blacklisted words"""
-    normalized = normalize_message(message)
-    for word in PROFANITY_BLACKLIST:
-        if word.lower() in normalized:
-            return True
-    return False
+    if normalized is None:
+        normalized = normalize_message(message)
+    if len(normalized) < MIN_PROFANITY_LEN:
+        return False
+    return PROFANITY_RE.search(normalized) is not None
 
 
 def contains_advertising(message: str) -> bool:
     """Check if message contains advertising/URLs"""
-    normalized = message.lower()
-    for pattern in ADVERTISING_PATTERNS:
-        if re.search(pattern, normalized, re.IGNORECASE):
-            return True
-    return False
-
-
-async def get_recent_messages(user_id: str, seconds: int = SPAM_TIME_WINDOW_SECONDS) -> list:
-    """Get user's recent messages within time window"""
-    cutoff = datetime.now(timezone.utc) - timedelta(seconds=seconds)
-    cutoff_str = cutoff.isoformat()
-    
-    messages = await db.chat_messages.find(
-        {"user_id": user_id, "timestamp": {"$gte": cutoff_str}},
-        {"_id": 0, "message": 1, "timestamp": 1}
-    ).sort("timestamp", -1).to_list(10)
-    
-    return messages
+    # Without '.' or ':' none of the link patterns can match
+    if "." not in message and ":" not in message:
+        return ADVERTISING_KEYWORD_RE.search(message) is not None
+    return ADVERTISING_RE.search(message) is not None
 
 
-async def check_spam(user_id: str, new_message: str) -> bool:
+def detect_content_violation(message: str, normalized: str = None) -> Optional[str]:
+    """Scan message content once; returns "advertising", "profanity" or None"""
+    # Advertising first - it carries the strictest penalty
+    if contains_advertising(message):
+        return "advertising"
+    if contains_profanity(message, normalized):
+        return "profanity"
+    return None
+
+
+def get_recent_messages(user_id: str, seconds: int = SPAM_TIME_WINDOW_SECONDS) -> list:
+    """Get user's recent normalized messages within time window (newest first)"""
+    recent = recent_chat_messages.get(user_id)
+    if not recent:
+        return []
+    
+    cutoff = time.monotonic() - seconds
+    while recent and recent[0][0] < cutoff:
+        recent.popleft()
+    if not recent:
+        del recent_chat_messages[user_id]
+        return []
+    
+    return [message for _, message in reversed(recent)]
+
+
+def remember_chat_message(user_id: str, message: str):
+    """Record an accepted chat message in the recent-message cache"""
+    now = time.monotonic()
+    recent = recent_chat_messages.get(user_id)
+    if recent is None:
+        if len(recent_chat_messages) >= RECENT_CHAT_CACHE_MAX_USERS:
+            # Drop users whose newest message is already outside the spam window
+            cutoff = now - SPAM_TIME_WINDOW_SECONDS
+            idle = [uid for uid, msgs in recent_chat_messages.items() if not msgs or msgs[-1][0] < cutoff]
+            for uid in idle:
+                del recent_chat_messages[uid]
+        recent = recent_chat_messages[user_id] = deque(maxlen=SPAM_RECENT_MESSAGES_LIMIT)
+    recent.append((now, normalize_message(message)))
+
+
+def check_spam(user_id: str, new_message: str, normalized: str = None) -> bool:
     """Check if the new message is spam (repeated message)"""
-    recent_messages = await get_recent_messages(user_id)
+    recent_messages = get_recent_messages(user_id)
+    if not recent_messages:
+        return False
+    
+    if normalized is None:
+        normalized = normalize_message(new_message)
     
-    for msg in recent_messages:
-        similarity = calculate_similarity(new_message, msg.get("message", ""))
-        if similarity >= SPAM_SIMILARITY_THRESHOLD:
-            return True
+    # Literal repeats are the common case - skip the similarity pass for them
+    if normalized in recent_messages:
+        return True
     
-    return False
+    # Score all recent messages in one C++ call; the cutoff lets it stop at the first hit
+    match = process.extractOne(
+        normalized,
+        recent_messages,
+        scorer=fuzz.ratio,
+        score_cutoff=SPAM_SIMILARITY_THRESHOLD * 100
+    )
+    return match is not None
 
 
 async def get_moderation_counters(user_id: str) -> dict:
@@ -280,6 +405,11 @@ async def get_moderation_counters(user_id: str) -> dict:
         {"_id": 0, "spam_count": 1, "profanity_count": 1, "advertising_count": 1, 
          "permanently_chat_muted": 1, "mute_until": 1}
     )
+    return moderation_counters_from_user(user)
+
+
+def moderation_counters_from_user(user: Optional[dict]) -> dict:
+    """Extract moderation offense counters from a (possibly partial) user document"""
     return {
         "spam_count": user.get("spam_count", 0) if user else 0,
         "profanity_count": user.get("profanity_count", 0) if user else 0,
@@ -317,34 +447,54 @@ async def send_discord_auto_mute_log(username: str, violation_type: str, duratio
         "fields": fields
     }
 
-    async with aiohttp.ClientSession() as session:
-        await session.post(webhook, json={"embeds": [embed]})
+    await HTTP_CLIENT.post(webhook, json={"embeds": [embed]})
 
 
-async def apply_chat_mute(user_id: str, username: str, duration_seconds: int, reason: str, violation_type: str, message_content: str = None):
-    """Apply a chat mute to a user and log it"""
-    now = datetime.now(timezone.utc)
-    
+def build_mute_fields(duration_seconds: int, now: datetime) -> tuple:
+    """Return ($set fields, mute_until) for an escalation step (-1 = permanent, 0 = warning only)"""
     if duration_seconds == -1:
-        # Permanent mute
-        await db.users.update_one(
-            {"user_id": user_id},
-            {"$set": {"permanently_chat_muted": True, "mute_until": None}}
-        )
-        mute_until = None
-        is_permanent = True
-    else:
-        # Temporary mute
-        mute_until = now + timedelta(seconds=duration_seconds)
-        await db.users.update_one(
-            {"user_id": user_id},
-            {"$set": {"mute_until": mute_until.isoformat()}}
-        )
-        is_permanent = False
+        return {"permanently_chat_muted": True, "mute_until": None}, None
+    if duration_seconds == 0:
+        return {}, None
+    mute_until = now + timedelta(seconds=duration_seconds)
+    return {"mute_until": mute_until}, mute_until
+
+
+async def apply_offense(user_id: str, counter_field: str, escalation: list, current_count: int) -> tuple:
+    """
+    Increment an offense counter and apply the escalated mute in a single write.
+    The escalation step is picked from the counter value expected after the increment;
+    if a concurrent violation already moved the counter, fall back to increment-then-mute.
+    Returns (duration_seconds, mute_until).
+    """
+    now = datetime.now(timezone.utc)
+    duration = escalation[min(current_count, len(escalation) - 1)]
+    mute_fields, mute_until = build_mute_fields(duration, now)
+    
+    update = {"$inc": {counter_field: 1}}
+    if mute_fields:
+        update["$set"] = mute_fields
+    expected_count = current_count if current_count else {"$in": [0, None]}
+    result = await db.users.update_one({"user_id": user_id, counter_field: expected_count}, update)
+    if result.matched_count:
+        return duration, mute_until
+    
+    new_count = await increment_offense_counter(user_id, counter_field)
+    duration = escalation[min(new_count - 1, len(escalation) - 1)]
+    mute_fields, mute_until = build_mute_fields(duration, now)
+    if mute_fields:
+        await db.users.update_one({"user_id": user_id}, {"$set": mute_fields})
+    return duration, mute_until
+
+
+def log_chat_mute(user_id: str, username: str, duration_seconds: int, mute_until: Optional[datetime], reason: str, violation_type: str, message_content: str = None):
+    """Log an applied chat mute (moderation log + Discord)"""
+    now = datetime.now(timezone.utc)
+    is_permanent = duration_seconds == -1
     
     # Log moderation action
     log_entry = {
-        "log_id": f"mod_{uuid.uuid4().hex[:12]}",
+        "log_id": f"mod_{secrets.token_hex(6)}",
         "user_id": user_id,
         "username": username,
         "action": "permanent_chat_mute" if is_permanent else "chat_mute",
@@ -356,11 +506,8 @@ async def apply_chat_mute(user_id: str, username: str, duration_seconds: int, re
         "message_content": message_content,
         "timestamp": now.isoformat()
     }
-    await db.moderation_logs.insert_one(log_entry)
-    
-    await send_discord_auto_mute_log(username, violation_type, duration_seconds, is_permanent, message_content)
-
-    return mute_until, is_permanent
+    spawn_background_task(db.moderation_logs.insert_one(log_entry))
+    spawn_background_task(send_discord_auto_mute_log(username, violation_type, duration_seconds, is_permanent, message_content))
 
 
 async def increment_offense_counter(user_id: str, counter_field: str) -> int:
@@ -382,14 +529,50 @@ class ModerationResult:
         self.muted = muted
 
 
-async def moderate_message(user_id: str, username: str, message: str) -> ModerationResult:
+async def handle_violation(user_id: str, username: str, violation_type: str, message: str, counters: dict) -> ModerationResult:
+    """Escalate a detected violation and build the user-facing moderation result"""
+    config = VIOLATION_CONFIG[violation_type]
+    counter_field = config["counter_field"]
+    duration, mute_until = await apply_offense(user_id, counter_field, config["escalation"], counters[counter_field])
+    
+    if duration == 0:
+        # Warning only - log it, no mute
+        log_entry = {
+            "log_id": f"mod_{secrets.token_hex(6)}",
+            "user_id": user_id,
+            "username": username,
+            "action": "warning",
+            "violation_type": violation_type,
+            "reason": config["warning_reason"],
+            "message_content": message[:100],  # Store first 100 chars
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
+        spawn_background_task(db.moderation_logs.insert_one(log_entry))
+        return ModerationResult(allowed=False, error_message=config["warning_message"])
+    
+    message_content = message if config["log_message"] else None
+    if duration == -1:
+        log_chat_mute(user_id, username, -1, None, config["permanent_reason"], violation_type, message_content)
+        error_message = config["permanent_message"]
+    else:
+        log_chat_mute(user_id, username, duration, mute_until, config["mute_reason"], violation_type, message_content)
+        error_message = config["mute_message"].format(minutes=duration // 60)
+    
+    return ModerationResult(allowed=False, error_message=error_message, muted=True)
+
+
+async def moderate_message(user_id: str, username: str, message: str, user: dict = None) -> ModerationResult:
     """
     Main moderation function - checks message for violations.
     Returns ModerationResult indicating if message is allowed.
+    Pass the already-loaded user document to skip re-reading the counters.
     """
     
     # Check if user is permanently muted
-    counters = await get_moderation_counters(user_id)
+    if user is not None:
+        counters = moderation_counters_from_user(user)
+    else:
+        counters = await get_moderation_counters(user_id)
     if counters["permanently_chat_muted"]:
         return ModerationResult(
             allowed=False,
@@ -399,7 +582,7 @@ async def moderate_message(user_id: str, username: str, message: str) -> Moderat
     # Check existing mute
     mute_until = counters.get("mute_until")
     if mute_until:
-        if isinstance(mute_until, str):
+        if isinstance(mute_until, str):  # Legacy ISO string
             mute_until = datetime.fromisoformat(mute_until)
         if mute_until.tzinfo is None:
             mute_until = mute_until.replace(tzinfo=timezone.utc)
@@ -412,90 +595,16 @@ async def moderate_message(user_id: str, username: str, message: str) -> Moderat
                 error_message=f"You are muted for {remaining} more seconds."
             )
     
-    # 1. CHECK FOR ADVERTISING (highest priority - strictest penalty)
-    if contains_advertising(message):
-        new_count = await increment_offense_counter(user_id, "advertising_count")
-        offense_index = min(new_count - 1, len(ADVERTISING_ESCALATION) - 1)
-        duration = ADVERTISING_ESCALATION[offense_index]
-        
-        if duration == -1:
-            await apply_chat_mute(user_id, username, -1, "Repeated advertising", "advertising", message)
-            return ModerationResult(
-                allowed=False,
-                error_message="You have been permanently muted in chat due to unauthorized advertising. If you believe this was a mistake, please contact us on Discord.",
-                muted=True
-            )
-        else:
-            mute_until, _ = await apply_chat_mute(user_id, username, duration, "Advertising detected", "advertising", message)
-            minutes = duration // 60
-            return ModerationResult(
-                allowed=False,
-                error_message=f"You have been muted for {minutes} minutes due to unauthorized advertising.",
-                muted=True
-            )
+    # Normalize once and share it between all checks
+    normalized = normalize_message(message)
     
-    # 2. CHECK FOR PROFANITY
-    if contains_profanity(message):
-        new_count = await increment_offense_counter(user_id, "profanity_count")
-        offense_index = min(new_count - 1, len(PROFANITY_ESCALATION) - 1)
-        duration = PROFANITY_ESCALATION[offense_index]
-        
-        if duration == -1:
-            await apply_chat_mute(user_id, username, -1, "Repeated profanity", "profanity", message)
-            return ModerationResult(
-                allowed=False,
-                error_message="You have been permanently muted in chat due to repeated offensive language. If you believe this was a mistake, please contact us on Discord.",
-                muted=True
-            )
-        elif duration == 0:
-            # Warning only (first offense)
-            # Log the warning
-            log_entry = {
-                "log_id": f"mod_{uuid.uuid4().hex[:12]}",
-                "user_id": user_id,
-                "username": username,
-                "action": "warning",
-                "violation_type": "profanity",
-                "reason": "First profanity offense - warning issued",
-                "message_content": message[:100],  # Store first 100 chars
-                "timestamp": datetime.now(timezone.utc).isoformat()
-            }
-            await db.moderation_logs.insert_one(log_entry)
-            return ModerationResult(
-                allowed=False,
-                error_message="That was not very nice. Please keep the chat respectful."
-            )
-        else:
-            await apply_chat_mute(user_id, username, duration, "Profanity detected", "profanity", message)
-            minutes = duration // 60
-            return ModerationResult(
-                allowed=False,
-                error_message=f"You have been muted for {minutes} minutes due to offensive language. Please keep the chat respectful.",
-                muted=True
-            )
+    # Advertising (strictest penalty) and profanity come first, spam needs the recent history
+    violation = detect_content_violation(message, normalized)
+    if violation is None and check_spam(user_id, message, normalized):
+        violation = "spam"
     
-    # 3. CHECK FOR SPAM
-    is_spam = await check_spam(user_id, message)
-    if is_spam:
-        new_count = await increment_offense_counter(user_id, "spam_count")
-        offense_index = min(new_count - 1, len(SPAM_ESCALATION) - 1)
-        duration = SPAM_ESCALATION[offense_index]
-        
-        if duration == -1:
-            await apply_chat_mute(user_id, username, -1, "Repeated spam", "spam")
-            return ModerationResult(
-                allowed=False,
-                error_message="You have been permanently muted in chat due to repeated spam. If you believe this was a mistake, please contact us on Discord.",
-                muted=True
-            )
-        else:
-            await apply_chat_mute(user_id, username, duration, "Spam detected", "spam")
-            minutes = duration // 60
-            return ModerationResult(
-                allowed=False,
-                error_message=f"You have been muted for {minutes} minutes due to spam. Please stop spamming.",
-                muted=True
-            )
+    if violation is not None:
+        return await handle_violation(user_id, username, violation, message, counters)
     
     # Message passed all checks
     return ModerationResult(allowed=True)
@@ -530,6 +639,10 @@ LEVEL_XP_REQUIREMENTS = [
     21200,  # Level 20
 ]
 
+# Cumulative XP at which each level starts: level L begins at LEVEL_CUMULATIVE_XP[L - 1].
+# Levels beyond the predefined list are appended on demand (see extend_level_table).
+LEVEL_CUMULATIVE_XP = [0, *accumulate(LEVEL_XP_REQUIREMENTS[1:])]
+
 # ============== GAME PASS CONFIG ==============
 # Game Pass is ~3-5x easier than normal levels (20-30% effort per level)
 # If normal level = 500 XP, Game Pass level = 100-150 XP
@@ -943,6 +1056,9 @@ class CosmeticType(str):
     NAME_COLOR = "name_color" # Color of player name in chat
     JACKPOT_PATTERN = "jackpot_pattern"  # Visible during jackpot wins
 
+# Closed set of cosmetic tiers; kept as strings since that is what the API returns
+PrestigeTier = Literal["free", "standard", "premium", "legendary"]
+
 class PrestigeCosmeticTemplate(BaseModel):
     """Template definition for a prestige cosmetic item"""
     model_config = ConfigDict(extra="ignore")
@@ -952,9 +1068,9 @@ class PrestigeCosmeticTemplate(BaseModel):
     description: str          # Flavor text
     asset_path: Optional[str] = None  # Path to visual asset (icon/pattern)
     asset_value: Optional[str] = None # Direct value (e.g., hex color)
-    prestige_cost: int        # Cost in A currency
-    tier: str = "standard"    # standard, premium, legendary
-    unlock_level: int = 0     # Minimum level required (0 = no requirement)
+    prestige_cost: int = Field(..., ge=0, strict=True)  # Cost in A currency
+    tier: PrestigeTier = "standard"  # free, standard, premium, legendary
+    unlock_level: int = Field(0, ge=0, strict=True)  # Minimum level required (0 = no requirement)
     is_available: bool = True # Can be purchased
 
 class UserPrestigeItem(BaseModel):
@@ -1209,12 +1325,50 @@ PRESTIGE_COSMETICS = {
     }
 }
 
+# Build step: run every template through PrestigeCosmeticTemplate once at import.
+# This rejects malformed entries at startup and fills defaults, so each record
+# carries the full field set and readers can index fields directly
+PRESTIGE_COSMETICS = {
+    cosmetic_id: PrestigeCosmeticTemplate(**template).model_dump()
+    for cosmetic_id, template in PRESTIGE_COSMETICS.items()
+}
+
+# Basic jackpot patterns handed out at random to new (or reset) accounts
+DEFAULT_JACKPOT_PATTERNS = ("default_lightblue", "default_pink", "default_red", "default_orange", "default_yellow")
+
+# Derived id views over the static templates, built once at import so the shop and
+# owned endpoints don't re-filter every template on each request
+FREE_PRESTIGE_COSMETIC_IDS = tuple(
+    cosmetic_id for cosmetic_id, template in PRESTIGE_COSMETICS.items()
+    if template["prestige_cost"] == 0 and template["is_available"]
+)
+# Shop display order: by type, then by cost (integer ranks, sorted once here)
+PRESTIGE_TYPE_ORDER = {"name_color": 0, "tag": 1, "jackpot_pattern": 2}
+SHOP_PRESTIGE_COSMETIC_IDS = tuple(sorted(
+    (
+        cosmetic_id for cosmetic_id, template in PRESTIGE_COSMETICS.items()
+        if template["prestige_cost"] > 0 and template["is_available"]
+    ),
+    key=lambda cosmetic_id: (
+        PRESTIGE_TYPE_ORDER.get(PRESTIGE_COSMETICS[cosmetic_id]["cosmetic_type"], 99),
+        PRESTIGE_COSMETICS[cosmetic_id]["prestige_cost"]
+    )
+))
+
 # ============== JACKPOT MODELS ==============
 
 class JackpotJoinRequest(BaseModel):
-    bet_amount: float = Field(..., ge=0.01)  # No upper limit - constrained by balance only
+    bet_amount: float = Field(..., ge=0.01, strict=True)  # No upper limit - constrained by balance only
+
+# Schema-only models (they document a payload shape but are never validated at
+# runtime) defer building their pydantic core schema until first use
+SCHEMA_ONLY_MODEL_CONFIG = ConfigDict(defer_build=True)
 
+# Participants and status are built from server-side jackpot_state, so the endpoints
+# skip re-validating data we produced ourselves: the winner and the polled status
+# are plain dicts of these shapes, serialized directly with orjson
 class JackpotParticipant(BaseModel):
+    model_config = SCHEMA_ONLY_MODEL_CONFIG
     user_id: str
     username: str
     bet_amount: float
@@ -1223,6 +1377,7 @@ class JackpotParticipant(BaseModel):
     jackpot_pattern: Optional[str] = None
 
 class JackpotStatus(BaseModel):
+    model_config = SCHEMA_ONLY_MODEL_CONFIG
     state: str  # idle, waiting, active, spinning, complete
     total_pot: float
     participants: List[JackpotParticipant]
@@ -1236,40 +1391,53 @@ class JackpotStatus(BaseModel):
 # ============== TRADING SYSTEM MODELS ==============
 
 TRADE_G_FEE_PERCENT = 0.30  # 30% fee on G transfers (burned from economy)
+TRADE_G_FEE_BPS = round(TRADE_G_FEE_PERCENT * 10000)  # Same fee in basis points, for exact integer math
 TRADE_MAX_ITEMS_PER_SIDE = 10
 
-class TradeOfferItem(BaseModel):
-    """An item offered in a trade"""
+def calculate_trade_g_fee(g_amount: float) -> float:
+    """Fee burned on top of a G transfer, computed on integer cents (half rounds up)."""
+    if g_amount <= 0:
+        return 0.0
+    cents = round(g_amount * 100)
+    return (cents * TRADE_G_FEE_BPS + 5000) // 10000 / 100
+
+class TradeOfferItem(TypedDict):
+    """An item offered in a trade (plain dict, validated inline by its parent model)"""
     inventory_id: str
     item_id: str
     item_name: str
     item_rarity: str
-    item_image: Optional[str] = None
+    item_image: NotRequired[Optional[str]]
+
+# Per-side item limit enforced by the request schema, before any item is validated
+TradeInventoryIds = Annotated[List[str], Field(max_length=TRADE_MAX_ITEMS_PER_SIDE)]
 
 class TradeOffer(BaseModel):
     """One side's offer in a trade"""
+    model_config = SCHEMA_ONLY_MODEL_CONFIG
     user_id: str
     username: str
-    items: List[TradeOfferItem] = []
+    items: Annotated[List[TradeOfferItem], Field(max_length=TRADE_MAX_ITEMS_PER_SIDE)] = []
     g_amount: float = 0.0  # G currency offered (before fee)
 
 class TradeCreateRequest(BaseModel):
     """Request to create a new trade"""
     recipient_username: str
-    offered_items: List[str] = []  # List of inventory_ids
+    offered_items: TradeInventoryIds = []  # List of inventory_ids
     offered_g: float = 0.0
-    requested_items: List[str] = []  # List of inventory_ids from recipient
+    requested_items: TradeInventoryIds = []  # List of inventory_ids from recipient
     requested_g: float = 0.0
 
 class TradeCounterRequest(BaseModel):
     """Request to counter a trade offer"""
-    offered_items: List[str] = []  # List of inventory_ids
+    offered_items: TradeInventoryIds = []  # List of inventory_ids
     offered_g: float = 0.0
-    requested_items: List[str] = []  # List of inventory_ids from other party
+    requested_items: TradeInventoryIds = []  # List of inventory_ids from other party
     requested_g: float = 0.0
 
 class TradeResponse(BaseModel):
     """Trade data response"""
+    model_config = SCHEMA_ONLY_MODEL_CONFIG
     trade_id: str
     status: str  # pending, completed
     initiator: TradeOffer
@@ -1289,45 +1457,73 @@ class TradeResponse(BaseModel):
 # 4 Horizontal (rows) + 4 Vertical (columns)
 # No diagonals, zigzags, V-shapes, curves, or specials
 
-PAYLINES_4x4 = {
+# Paths are tuples so the table is an immutable constant that can be shared as-is.
+# Payline numbers are 1-based: payline N is PAYLINES_4x4[N - 1] (see get_payline)
+PAYLINES_4x4 = (
     # Horizontal paylines (4 rows, each spanning 4 columns)
-    1: [(0, 0), (0, 1), (0, 2), (0, 3)],   # Row 0 - Top horizontal
-    2: [(1, 0), (1, 1), (1, 2), (1, 3)],   # Row 1 - Second horizontal
-    3: [(2, 0), (2, 1), (2, 2), (2, 3)],   # Row 2 - Third horizontal
-    4: [(3, 0), (3, 1), (3, 2), (3, 3)],   # Row 3 - Bottom horizontal
+    ((0, 0), (0, 1), (0, 2), (0, 3)),   # 1: Row 0 - Top horizontal
+    ((1, 0), (1, 1), (1, 2), (1, 3)),   # 2: Row 1 - Second horizontal
+    ((2, 0), (2, 1), (2, 2), (2, 3)),   # 3: Row 2 - Third horizontal
+    ((3, 0), (3, 1), (3, 2), (3, 3)),   # 4: Row 3 - Bottom horizontal
     # Vertical paylines (4 columns, each spanning 4 rows)
-    5: [(0, 0), (1, 0), (2, 0), (3, 0)],   # Column 0 - Leftmost vertical
-    6: [(0, 1), (1, 1), (2, 1), (3, 1)],   # Column 1 - Second vertical
-    7: [(0, 2), (1, 2), (2, 2), (3, 2)],   # Column 2 - Third vertical
-    8: [(0, 3), (1, 3), (2, 3), (3, 3)],   # Column 3 - Rightmost vertical
-}
+    ((0, 0), (1, 0), (2, 0), (3, 0)),   # 5: Column 0 - Leftmost vertical
+    ((0, 1), (1, 1), (2, 1), (3, 1)),   # 6: Column 1 - Second vertical
+    ((0, 2), (1, 2), (2, 2), (3, 2)),   # 7: Column 2 - Third vertical
+    ((0, 3), (1, 3), (2, 3), (3, 3)),   # 8: Column 3 - Rightmost vertical
+)
+
+def get_payline(line_num: int) -> Optional[tuple]:
+    """Path of a 1-based payline number, or None if no such payline exists."""
+    if 1 <= line_num <= len(PAYLINES_4x4):
+        return PAYLINES_4x4[line_num - 1]
+    return None
+
+# Response-ready [[row, col], ...] form of each payline, shared by every win
+# result (read-only by convention - copy before mutating)
+PAYLINE_PATHS_JSON = tuple([[r, c] for (r, c) in path] for path in PAYLINES_4x4)
 
 # Line presets for quick selection (max 8 lines now)
 LINE_PRESETS = {
-    4: [1, 2, 3, 4],           # Horizontal only
-    8: list(range(1, 9)),      # All 8 lines
+    4: (1, 2, 3, 4),           # Horizontal only
+    8: tuple(range(1, 9)),     # All 8 lines
 }
 
 # ============================================================================
 # REEL STRIP BUILDER
 # ============================================================================
-def build_reel_strip(distribution: dict, strip_length: int = 1000) -> list:
+def build_reel_cdf(distribution: dict, strip_length: int = 1000) -> tuple:
     """
-    Build a physical reel strip from a symbol distribution.
-    Distribution values are weights (how many of each symbol on the strip).
-    """
-    strip = []
-    for symbol, count in distribution.items():
-        strip.extend([symbol] * count)
+    Cumulative reel strip: (symbols, cumulative counts). Distribution values are
+    weights (how many of each symbol on the strip); the strip is padded with the
+    most common symbol or truncated to strip_length, and kept in order instead of
+    as shuffled entries.
     
-    # Pad or truncate to exact strip length
-    while len(strip) < strip_length:
-        strip.append("orange")  # Pad with most common symbol
-    strip = strip[:strip_length]
+    Results are memoized per distribution, so identical reels share one CDF.
+    """
+    return _build_reel_cdf(tuple(distribution.items()), strip_length)
+
+@lru_cache(maxsize=None)
+def _build_reel_cdf(distribution_items: tuple, strip_length: int) -> tuple:
+    counts = dict(distribution_items)
+    deficit = strip_length - sum(counts.values())
+    if deficit > 0:
+        counts["orange"] = counts.get("orange", 0) + deficit  # Pad with most common symbol
+    symbols = tuple(counts)
+    cumulative = tuple(min(total, strip_length) for total in accumulate(counts.values()))
+    return symbols, cumulative
+
+def draw_reel_symbols(reel_cdf: tuple, rows: int, rng: Optional[random.Random] = None) -> list:
+    """
+    Visible symbols for one reel stop. A window of `rows` consecutive cells on a
+    freshly shuffled strip is a uniformly random ordered set of distinct strip
+    positions, so sample those positions directly and map them through the CDF.
     
-    # Shuffle to distribute symbols randomly on the strip
-    random.shuffle(strip)
-    return strip
+    Pass a seeded random.Random as rng to get reproducible draws (RTP verification);
+    live spins use the module-level generator.
+    """
+    symbols, cumulative = reel_cdf
+    rng = rng or random
+    return [symbols[bisect_right(cumulative, pos)] for pos in rng.sample(range(cumulative[-1]), rows)]
 
 # ============================================================================
 # MASTER SLOT CONFIGURATION TABLE
@@ -1408,12 +1604,33 @@ def build_config_from_table(config_table):
 # Build configuration
 CLASSIC_SYMBOLS, CLASSIC_REEL_DISTRIBUTIONS = build_config_from_table(CLASSIC_SYMBOL_CONFIG)
 
-# Build the actual reel strips at startup (1000 positions for precise control)
-CLASSIC_REEL_STRIPS = {
-    reel_idx: build_reel_strip(dist, 1000)
+# Reel CDFs built at startup (1000 positions for precise control)
+CLASSIC_REEL_STRIP_CDFS = {
+    reel_idx: build_reel_cdf(dist, 1000)
     for reel_idx, dist in CLASSIC_REEL_DISTRIBUTIONS.items()
 }
 
+def nerf_wild_distribution(distribution: dict) -> dict:
+    """Reel distribution with Wild reduced to WILD_NERF_PROBABILITY, the rest moved to orange."""
+    nerfed = dict(distribution)
+    if 'wild' in nerfed:
+        # Reduce Wild weight from ~30 (3%) to ~1 (0.1%)
+        nerf_weight = int(WILD_NERF_PROBABILITY * 10)  # 0.1% = weight of 1
+        weight_reduction = nerfed['wild'] - nerf_weight
+        nerfed['wild'] = nerf_weight
+        # Redistribute the removed Wild weight to orange (most common)
+        nerfed['orange'] = nerfed.get('orange', 0) + weight_reduction
+    return nerfed
+
+def build_wild_nerf_reel_cdfs(reel_distributions: dict) -> dict:
+    """Per reel: (regular CDF, Wild-nerfed CDF), both precomputed for the spin path."""
+    return {
+        reel_idx: (build_reel_cdf(dist, 1000), build_reel_cdf(nerf_wild_distribution(dist), 1000))
+        for reel_idx, dist in reel_distributions.items()
+    }
+
+CLASSIC_REEL_CDFS = build_wild_nerf_reel_cdfs(CLASSIC_REEL_DISTRIBUTIONS)
+
 def get_symbol_probability_on_reel(symbol: str, reel_idx: int) -> float:
     """Calculate probability of a symbol appearing on a specific reel."""
     dist = CLASSIC_REEL_DISTRIBUTIONS.get(reel_idx, {})
@@ -1429,6 +1646,10 @@ def get_average_symbol_probability(symbol: str, reel_distributions: dict) -> flo
         total_prob += (symbol_count / reel_total) * 100 if reel_total > 0 else 0
     return round(total_prob / len(reel_distributions), 2)
 
+def get_wild_symbols(symbols: dict) -> frozenset:
+    """Names of the Wild symbols in a slot's symbol table."""
+    return frozenset(name for name, data in symbols.items() if data.get("is_wild", False))
+
 # ============== SLOT MACHINE CONFIGS (All 4x4) ==============
 
 SLOT_CONFIGS = {
@@ -1440,8 +1661,9 @@ SLOT_CONFIGS = {
         "volatility": "medium",
         "rtp": 95.5,
         "symbols": CLASSIC_SYMBOLS,
-        "reel_strips": CLASSIC_REEL_STRIPS,
+        "reel_strip_cdfs": CLASSIC_REEL_STRIP_CDFS,
         "reel_distributions": CLASSIC_REEL_DISTRIBUTIONS,
+        "reel_cdfs": CLASSIC_REEL_CDFS,
         "features": {"wilds": True}
     },
     "book": {
@@ -1600,6 +1822,13 @@ SLOT_CONFIGS = {
     }
 }
 
+# Wild symbol set and integer (x100) multipliers per slot, precomputed for the spin path
+for _slot_config in SLOT_CONFIGS.values():
+    _slot_config["wild_symbols"] = get_wild_symbols(_slot_config["symbols"])
+    _slot_config["multipliers_x100"] = {
+        name: round(data["multiplier"] * 100) for name, data in _slot_config["symbols"].items()
+    }
+
 # Jackpot state (in production, use Redis)
 # ============== JACKPOT CONFIGURATION ==============
 JACKPOT_MAX_PARTICIPANTS = 50  # Hard cap: 2-50 players per jackpot
@@ -1613,20 +1842,112 @@ jackpot_state = {
     "participants": [],
     "total_pot": 0.0,
     "started_at": None,
-    "countdown_end": None,
+    "countdown_end": None,  # Unix timestamp (time.time()), so status polls compare plain floats
     "winner": None,
     "winner_index": None  # Server-authoritative winner position
 }
 jackpot_lock = asyncio.Lock()
 
+def publish_jackpot_snapshot():
+    """
+    Copy jackpot_state into a fresh, never-mutated status snapshot.
+    
+    Called under jackpot_lock once a join, spin, refund or reset has finished, so the
+    status endpoint can serve jackpot_snapshot without the lock and never sees a round
+    halfway through (participant added but pot or state not yet updated).
+    """
+    global jackpot_snapshot
+    total_pot = jackpot_state["total_pot"]
+    participants = jackpot_state["participants"]
+    # Rows are plain dicts in the JackpotParticipant layout - no per-participant model
+    jackpot_snapshot = {
+        "state": jackpot_state["state"],
+        "total_pot": total_pot,
+        "participants": [
+            {
+                "user_id": p["user_id"],
+                "username": p["username"],
+                "bet_amount": p["bet_amount"],
+                "win_chance": round(p["bet_amount"] / total_pot * 100, 2) if total_pot > 0 else 0.0,
+                "avatar": p.get("avatar"),
+                "jackpot_pattern": p.get("jackpot_pattern")
+            }
+            for p in participants
+        ],
+        "countdown_end": jackpot_state["countdown_end"],
+        "winner": jackpot_state.get("winner"),
+        "winner_index": jackpot_state.get("winner_index"),
+        "jackpot_id": jackpot_state.get("jackpot_id"),
+        "is_full": len(participants) >= JACKPOT_MAX_PARTICIPANTS
+    }
+
+jackpot_snapshot = {}
+publish_jackpot_snapshot()
+
+# Set on startup once users.email / users.username are unique-indexed; until then
+# (or if building them fails) register checks for existing accounts itself
+users_unique_indexes_ready = False
+
 # ============== HELPER FUNCTIONS ==============
 
+STATIC_JSON_CACHE_CONTROL = "public, max-age=300"
+LEADERBOARD_CACHE_TTL_SECONDS = 3.0  # Public leaderboards/live wins may lag this much
+LEADERBOARD_MAX_LIMIT = 100  # Caps rows per public leaderboard (and so the number of cache keys)
+PAYLOAD_CACHE_MAX_KEYS = 256  # Sweep expired entries once the cache grows past this
+
+# In-process TTL cache for public read-only payloads (single worker)
+# key -> (monotonic expiry, payload); pending holds the in-flight computation per key
+payload_cache: Dict[str, tuple] = {}
+payload_cache_pending: Dict[str, asyncio.Task] = {}
+
+def precompute_json(payload) -> tuple:
+    """Serialize a static payload once. Returns (body bytes, quoted ETag)."""
+    body = orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    return body, f'"{hashlib.sha1(body).hexdigest()}"'
+
+def orjson_response(payload) -> Response:
+    """Serialize a plain dict/list payload straight to JSON bytes (no jsonable_encoder pass)."""
+    return Response(content=orjson.dumps(payload), media_type="application/json")
+
+def static_json_response(request: Request, body: bytes, etag: str) -> Response:
+    """Serve precomputed JSON bytes, answering 304 when the client copy is current."""
+    headers = {"ETag": etag, "Cache-Control": STATIC_JSON_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+async def cached_payload(key: str, ttl: float, compute) -> Any:
+    """Return compute()'s result, reusing it for ttl seconds. Concurrent misses share one call."""
+    entry = payload_cache.get(key)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+    
+    task = payload_cache_pending.get(key)
+    if task is None:
+        task = asyncio.ensure_future(compute())
+        payload_cache_pending[key] = task
+        
+        def store(done: asyncio.Task):
+            payload_cache_pending.pop(key, None)
+            if done.cancelled() or done.exception() is not None:
+                return  # Next request retries
+            now = time.monotonic()
+            if len(payload_cache) >= PAYLOAD_CACHE_MAX_KEYS:
+                for stale_key in [k for k, (expires, _) in payload_cache.items() if expires <= now]:
+                    del payload_cache[stale_key]
+            payload_cache[key] = (now + ttl, done.result())
+        
+        task.add_done_callback(store)
+    # Shielded so one client disconnecting doesn't cancel the query the others wait on
+    return await asyncio.shield(task)
+
 def create_jwt_token(user_id: str) -> str:
-    expiration = datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRATION_HOURS)
+    # PyJWT takes NumericDate claims as plain epoch seconds
+    now = int(time.time())
     payload = {
         "user_id": user_id,
-        "exp": expiration,
-        "iat": datetime.now(timezone.utc)
+        "exp": now + JWT_EXPIRATION_HOURS * 3600,
+        "iat": now
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
@@ -1645,9 +1966,9 @@ def check_user_banned(user: dict) -> None:
     if banned_until is None:
         return
     
-    if isinstance(banned_until, str):
+    # Stored as a BSON date (see migrate_user_timestamps for legacy ISO strings)
+    if isinstance(banned_until, str):  # Legacy ISO string
         banned_until = datetime.fromisoformat(banned_until)
-    
     if banned_until.tzinfo is None:
         banned_until = banned_until.replace(tzinfo=timezone.utc)
     
@@ -1680,7 +2001,14 @@ async def get_current_user(request: Request) -> dict:
     
     JWT takes priority because it's explicitly passed in the request header,
     while cookies persist across sessions and could cause auth confusion.
+    
+    The resolved user is kept on request.state, so resolving it again within
+    the same request skips token verification and the users lookup.
     """
+    cached_user = getattr(request.state, "current_user", None)
+    if cached_user is not None:
+        return cached_user
+    
     auth_header = request.headers.get("Authorization")
     oauth_session = request.cookies.get("oauth_session")  # Google OAuth only
     
@@ -1694,6 +2022,7 @@ async def get_current_user(request: Request) -> dict:
             if user:
                 # 🔒 BAN CHECK (time-based)
                 check_user_banned(user)
+                request.state.current_user = user
                 return user
     
     # Then check OAuth session (Google OAuth users)
@@ -1705,7 +2034,7 @@ async def get_current_user(request: Request) -> dict:
         
         if session_doc:
             expires_at = session_doc.get("expires_at")
-            if isinstance(expires_at, str):
+            if isinstance(expires_at, str):  # Legacy ISO string (pre-TTL sessions)
                 expires_at = datetime.fromisoformat(expires_at)
             if expires_at.tzinfo is None:
                 expires_at = expires_at.replace(tzinfo=timezone.utc)
@@ -1718,63 +2047,21 @@ async def get_current_user(request: Request) -> dict:
                 if user:
                     # 🔒 BAN CHECK (time-based)
                     check_user_banned(user)
+                    request.state.current_user = user
                     return user
     
     raise HTTPException(status_code=401, detail="Not authenticated")
 
 def get_weighted_symbol(symbols: dict) -> str:
     """Get a random symbol based on weights"""
-    total_weight = sum(s["weight"] for s in symbols.values())
-    rand = random.randint(1, total_weight)
-    cumulative = 0
-    for symbol, data in symbols.items():
-        cumulative += data["weight"]
-        if rand <= cumulative:
-            return symbol
-    return list(symbols.keys())[0]
+    # random.choices accumulates the weights and bisects in C
+    return random.choices(list(symbols), weights=[s["weight"] for s in symbols.values()])[0]
 
-# ============== OUTCOME TABLE RNG SYSTEM ==============
-# FULL-LINE-ONLY wins - ALL 5 positions on a payline must match
+# ============== PAYLINE EVALUATION ==============
+# FULL-LINE-ONLY wins - ALL positions on a payline must match
 # No partial payouts (3/4 from left NOT allowed)
 
-OUTCOME_TABLE = [
-    # Losses - 50% of spins
-    {"type": "loss", "weight": 50, "wins": 0},
-    
-    # Small wins (low-value symbols, FULL LINE) - 25% of spins  
-    {"type": "win_cherry", "weight": 10, "wins": 1, "symbol": "cherry"},
-    {"type": "win_lemon", "weight": 8, "wins": 1, "symbol": "lemon"},
-    {"type": "win_orange", "weight": 7, "wins": 1, "symbol": "orange"},
-    
-    # Medium wins (mid-value symbols, FULL LINE) - 15% of spins
-    {"type": "win_bar", "weight": 8, "wins": 1, "symbol": "bar"},
-    {"type": "win_bar_multi", "weight": 4, "wins": 2, "symbol": "bar"},
-    {"type": "win_lemon_multi", "weight": 3, "wins": 2, "symbol": "lemon"},
-    
-    # Big wins (high-value symbols, FULL LINE) - 7% of spins
-    {"type": "win_seven", "weight": 4, "wins": 1, "symbol": "seven"},
-    {"type": "win_seven_multi", "weight": 2, "wins": 2, "symbol": "seven"},
-    {"type": "win_diamond", "weight": 1, "wins": 1, "symbol": "diamond"},
-    
-    # Jackpot wins (premium symbols, FULL LINE) - 3% of spins
-    {"type": "win_wild", "weight": 1.5, "wins": 1, "symbol": "wild"},
-    {"type": "win_diamond_multi", "weight": 0.8, "wins": 2, "symbol": "diamond"},
-    {"type": "win_wild_multi", "weight": 0.5, "wins": 2, "symbol": "wild"},
-    {"type": "win_mega", "weight": 0.2, "wins": 3, "symbol": "seven"},
-]
-
-def get_random_outcome():
-    """Select outcome from weighted outcome table"""
-    total_weight = sum(o["weight"] for o in OUTCOME_TABLE)
-    rand = random.uniform(0, total_weight)
-    cumulative = 0
-    for outcome in OUTCOME_TABLE:
-        cumulative += outcome["weight"]
-        if rand <= cumulative:
-            return outcome
-    return OUTCOME_TABLE[0]  # Default to loss
-
-def check_payline_win(grid: list, line_path: list, symbols: dict) -> dict:
+def check_payline_win(grid: list, line_path: tuple, wild_symbols: frozenset) -> dict:
     """
     Check if a payline has a FULL-LINE win.
     
@@ -1785,77 +2072,75 @@ def check_payline_win(grid: list, line_path: list, symbols: dict) -> dict:
     - Horizontal lines: ALL 5 positions must match
     - Vertical lines: ALL 4 positions must match
     
+    wild_symbols is the slot's Wild set (see get_wild_symbols).
     Returns win info or None if no valid full-line win.
     """
     line_length = len(line_path)
     if line_length < 4:  # Minimum 4 for vertical lines
         return None
     
-    # Get symbols at ALL positions along this payline
-    line_symbols = [grid[r][c] for (r, c) in line_path]
-    
-    # Find the base symbol (first non-wild from left/top)
+    # Single pass along the payline: the first non-wild (from left/top) is the
+    # base symbol, and any later non-wild that differs from it is NO WIN
     base_symbol = None
-    for sym in line_symbols:
-        if not symbols.get(sym, {}).get("is_wild", False):
+    for (r, c) in line_path:
+        sym = grid[r][c]
+        if sym in wild_symbols:
+            continue
+        if base_symbol is None:
             base_symbol = sym
-            break
-    
-    # If all symbols are wild, it's a wild-line win
-    if base_symbol is None:
-        base_symbol = "wild"
-    
-    # STRICT CHECK: EVERY position must match base symbol OR be wild
-    # If ANY position fails this check, return None (no win)
-    for idx, sym in enumerate(line_symbols):
-        is_base_match = (sym == base_symbol)
-        is_wild = symbols.get(sym, {}).get("is_wild", False)
-        
-        if not is_base_match and not is_wild:
-            # Found a non-matching, non-wild symbol - NO WIN
+        elif sym != base_symbol:
             return None
     
-    # Full line match! All positions valid.
+    # Full line match! All positions valid (all Wilds is a wild-line win)
     return {
-        "symbol": base_symbol,
+        "symbol": base_symbol or "wild",
         "matched_positions": list(line_path),  # All positions (4 or 5)
         "line_length": line_length  # Track if horizontal (5) or vertical (4)
     }
 
 
-def validate_all_paylines(grid: list, active_lines: List[int], symbols: dict) -> list:
+def validate_all_paylines(grid: list, active_lines: List[int], symbols: dict, wild_symbols: frozenset = None) -> list:
     """
     Validate ALL active paylines for FULL-LINE wins only.
     Returns list of winning paylines with complete data.
     Supports 8 straight paylines: 4 horizontal (5 symbols) + 4 vertical (4 symbols)
+    
+    Each line goes through check_payline_win, the single implementation of the
+    full-line/wild rule. Pass the slot's precomputed wild_symbols to avoid
+    rebuilding the set.
     """
+    if wild_symbols is None:
+        wild_symbols = get_wild_symbols(symbols)
+    
     winning_paylines = []
     
     for line_num in active_lines:
-        if line_num not in PAYLINES_4x4:
+        line_path = get_payline(line_num)
+        if line_path is None:
             continue
         
-        line_path = PAYLINES_4x4[line_num]
-        win_info = check_payline_win(grid, line_path, symbols)
+        win = check_payline_win(grid, line_path, wild_symbols)
+        if win is None:
+            continue
         
-        if win_info:
-            # Get symbol multiplier
-            symbol_mult = symbols.get(win_info["symbol"], {}).get("multiplier", 1.0)
-            line_length = win_info.get("line_length", len(line_path))
-            
-            winning_paylines.append({
-                "line_number": line_num,
-                "line_path": [[r, c] for (r, c) in win_info["matched_positions"]],
-                "symbol": win_info["symbol"],
-                "match_count": line_length,  # 4 for vertical, 5 for horizontal
-                "multiplier": symbol_mult,
-                "line_type": "horizontal" if line_length == 5 else "vertical"
-            })
+        # Get symbol multiplier
+        base_symbol = win["symbol"]
+        symbol_mult = symbols.get(base_symbol, {}).get("multiplier", 1.0)
+        line_length = win["line_length"]
+        
+        winning_paylines.append({
+            "line_number": line_num,
+            "line_path": PAYLINE_PATHS_JSON[line_num - 1],
+            "symbol": base_symbol,
+            "match_count": line_length,  # 4 for vertical, 5 for horizontal
+            "multiplier": symbol_mult,
+            "line_type": "horizontal" if line_length == 5 else "vertical"
+        })
     
     return winning_paylines
 
 
-def generate_random_grid_with_wild_nerf(symbols: dict, rows: int = 4, cols: int = 4, reel_distributions: dict = None) -> list:
+def generate_random_grid_with_wild_nerf(symbols: dict, rows: int = 4, cols: int = 4, reel_cdfs: dict = None, rng: Optional[random.Random] = None) -> list:
     """
     Generate a random grid using TRUE REEL STRIPS with WILD NERF MECHANIC.
     
@@ -1866,203 +2151,64 @@ def generate_random_grid_with_wild_nerf(symbols: dict, rows: int = 4, cols: int
     - The nerfed reel is DYNAMIC (random each spin), so players can't detect a pattern
     
     This simulates real slot machines while adding strategic anti-farm protection.
+    
+    reel_cdfs maps reel index to its (regular, nerfed) CDF pair from
+    build_wild_nerf_reel_cdfs, so no strip is built or shuffled per spin.
+    rng is an optional seeded random.Random for reproducible grids.
     """
-    import random
+    rng = rng or random
     
     # If no distributions provided, fall back to uniform
-    if not reel_distributions:
+    if not reel_cdfs:
         symbol_list = list(symbols.keys())
-        return [[random.choice(symbol_list) for _ in range(cols)] for _ in range(rows)]
+        return [[rng.choice(symbol_list) for _ in range(cols)] for _ in range(rows)]
     
     # Step 1: Select ONE random reel to "nerf" Wild probability this spin
-    nerfed_reel = random.randint(0, cols - 1)
+    nerfed_reel = rng.randint(0, cols - 1)
     
-    # Step 2: Generate each reel column with appropriate Wild probability
-    reel_stops = []
+    # Step 2: Generate each reel column with appropriate Wild probability,
+    # writing it straight into the row-major grid
+    grid = [[None] * cols for _ in range(rows)]
     for col_idx in range(cols):
-        # Get base distribution for this reel
-        base_dist = reel_distributions.get(col_idx, reel_distributions.get(0, {})).copy()
-        
-        # Apply Wild nerf if this is the nerfed reel
-        if col_idx == nerfed_reel and 'wild' in base_dist:
-            # Reduce Wild weight from ~30 (3%) to ~1 (0.1%)
-            original_wild_weight = base_dist.get('wild', 0)
-            nerf_weight = int(WILD_NERF_PROBABILITY * 10)  # 0.1% = weight of 1
-            weight_reduction = original_wild_weight - nerf_weight
-            base_dist['wild'] = nerf_weight
-            # Redistribute the removed Wild weight to orange (most common)
-            base_dist['orange'] = base_dist.get('orange', 0) + weight_reduction
-        
-        # Build reel strip from (potentially modified) distribution
-        strip = []
-        for symbol, weight in base_dist.items():
-            strip.extend([symbol] * weight)
-        
-        # Normalize to 1000 if needed
-        while len(strip) < 1000:
-            strip.append('orange')
-        strip = strip[:1000]
-        random.shuffle(strip)
+        # Pick this reel's CDF, using the Wild-nerfed one if this is the nerfed reel
+        regular_cdf, nerfed_cdf = reel_cdfs.get(col_idx, reel_cdfs[0])
+        reel_cdf = nerfed_cdf if col_idx == nerfed_reel else regular_cdf
         
-        # Roll RNG to determine stop position on this reel
-        stop_position = random.randint(0, len(strip) - 1)
-        
-        # Extract consecutive symbols starting from stop position
-        visible_symbols = []
-        for row_idx in range(rows):
-            symbol_idx = (stop_position + row_idx) % len(strip)
-            visible_symbols.append(strip[symbol_idx])
-        
-        reel_stops.append(visible_symbols)
-    
-    # Convert from column-major (reels) to row-major (grid) format
-    grid = []
-    for row_idx in range(rows):
-        row = []
-        for col_idx in range(cols):
-            row.append(reel_stops[col_idx][row_idx])
-        grid.append(row)
+        # Roll RNG for the visible symbols on this reel
+        for row_idx, symbol in enumerate(draw_reel_symbols(reel_cdf, rows, rng)):
+            grid[row_idx][col_idx] = symbol
     
     return grid
 
 
-def generate_random_grid(symbols: dict, rows: int = 4, cols: int = 4, reel_strips: dict = None) -> list:
+def generate_random_grid(symbols: dict, rows: int = 4, cols: int = 4, reel_cdfs: dict = None, rng: Optional[random.Random] = None) -> list:
     """
     Legacy wrapper - now delegates to Wild nerf version for "classic" slot.
     Kept for backward compatibility with other slot machines.
+    
+    reel_cdfs maps reel index to a build_reel_cdf result.
+    rng is an optional seeded random.Random for reproducible grids.
     """
-    import random
+    rng = rng or random
     
-    # If no reel strips provided, fall back to uniform distribution
-    if not reel_strips:
+    # If no reel CDFs provided, fall back to uniform distribution
+    if not reel_cdfs:
         symbol_list = list(symbols.keys())
-        return [[random.choice(symbol_list) for _ in range(cols)] for _ in range(rows)]
+        return [[rng.choice(symbol_list) for _ in range(cols)] for _ in range(rows)]
     
-    grid = []
+    # Row-major grid, filled one reel (column) at a time
+    grid = [[None] * cols for _ in range(rows)]
     
-    # For each reel (column), determine stop position and extract visible symbols
-    reel_stops = []
+    # For each reel (column), roll the visible symbols from its CDF
     for col_idx in range(cols):
-        # Get the physical reel strip for this column
-        reel_strip = reel_strips.get(col_idx, reel_strips.get(0, []))
-        
-        if not reel_strip:
-            # Fallback if no strip available
-            symbol_list = list(symbols.keys())
-            reel_stops.append([random.choice(symbol_list) for _ in range(rows)])
-        else:
-            # Roll RNG to determine stop position on this reel
-            stop_position = random.randint(0, len(reel_strip) - 1)
-            
-            # Extract consecutive symbols starting from stop position
-            visible_symbols = []
-            for row_idx in range(rows):
-                symbol_idx = (stop_position + row_idx) % len(reel_strip)
-                visible_symbols.append(reel_strip[symbol_idx])
-            
-            reel_stops.append(visible_symbols)
-    
-    # Convert from column-major (reels) to row-major (grid) format
-    for row_idx in range(rows):
-        row = []
-        for col_idx in range(cols):
-            row.append(reel_stops[col_idx][row_idx])
-        grid.append(row)
+        reel_cdf = reel_cdfs.get(col_idx, reel_cdfs[0])
+        for row_idx, symbol in enumerate(draw_reel_symbols(reel_cdf, rows, rng)):
+            grid[row_idx][col_idx] = symbol
     
     return grid
 
 
-def place_full_line_win(grid: list, line_num: int, symbol: str, symbols: dict) -> list:
-    """Place a FULL LINE of matching symbols along a payline path."""
-    if line_num not in PAYLINES_4x4:
-        return grid
-    
-    line_path = PAYLINES_4x4[line_num]
-    
-    # Fill ALL positions with the winning symbol
-    for (r, c) in line_path:
-        grid[r][c] = symbol
-    
-    return grid
-
-
-def break_accidental_wins(grid: list, active_lines: List[int], symbols: dict, exclude_lines: List[int] = None) -> list:
-    """Break any accidental full-line wins on paylines that shouldn't win."""
-    if exclude_lines is None:
-        exclude_lines = []
-    
-    symbol_list = list(symbols.keys())
-    
-    for line_num in active_lines:
-        if line_num in exclude_lines:
-            continue
-        if line_num not in PAYLINES_4x4:
-            continue
-        
-        line_path = PAYLINES_4x4[line_num]
-        win_info = check_payline_win(grid, line_path, symbols)
-        
-        if win_info:
-            # Break this win by changing a random position on the line
-            break_pos = random.randint(0, len(line_path) - 1)
-            r, c = line_path[break_pos]
-            base_sym = win_info["symbol"]
-            # Pick a different non-wild symbol
-            other_symbols = [s for s in symbol_list if s != base_sym and not symbols.get(s, {}).get("is_wild", False)]
-            if other_symbols:
-                grid[r][c] = random.choice(other_symbols)
-    
-    return grid
-
-
-def map_outcome_to_reels(outcome: dict, symbols: dict, active_lines: List[int], rows: int = 4, cols: int = 4, reel_strips: dict = None) -> tuple:
-    """
-    Generate reels for FULL-LINE-ONLY wins using per-reel probability strips.
-    
-    Payout formula: bet_per_line × symbol_multiplier
-    - Only pays when ALL 4 positions on a payline match
-    - Wild symbols substitute but don't define base symbol
-    - No partial payouts
-    """
-    # Start with random grid using per-reel weights
-    grid = generate_random_grid(symbols, rows, cols, reel_strips)
-    
-    if outcome["type"] == "loss":
-        # Break ALL accidental full-line wins
-        grid = break_accidental_wins(grid, active_lines, symbols)
-        # Double-check - should have no wins
-        winning_paylines = validate_all_paylines(grid, active_lines, symbols)
-        attempts = 0
-        while winning_paylines and attempts < 10:
-            grid = break_accidental_wins(grid, active_lines, symbols)
-            winning_paylines = validate_all_paylines(grid, active_lines, symbols)
-            attempts += 1
-        return grid, []
-    
-    # Create winning outcome - FULL LINE wins
-    win_symbol = outcome.get("symbol", "cherry")
-    num_wins = outcome.get("wins", 1)
-    
-    # Select random paylines to be winners
-    available_lines = [line for line in active_lines if line in PAYLINES_4x4]
-    if not available_lines:
-        return grid, []
-    
-    winning_line_nums = random.sample(available_lines, min(num_wins, len(available_lines)))
-    
-    # Place FULL LINE wins on selected paylines
-    for line_num in winning_line_nums:
-        grid = place_full_line_win(grid, line_num, win_symbol, symbols)
-    
-    # Break accidental wins on OTHER paylines
-    grid = break_accidental_wins(grid, active_lines, symbols, exclude_lines=winning_line_nums)
-    
-    # VALIDATE: Check actual wins on grid
-    winning_paylines = validate_all_paylines(grid, active_lines, symbols)
-    
-    return grid, winning_paylines
-
-def calculate_slot_result(bet_per_line: float, active_lines: List[int], slot_id: str = "classic") -> dict:
+def calculate_slot_result(bet_per_line: float, active_lines: List[int], slot_id: str = "classic", rng: Optional[random.Random] = None) -> dict:
     """
     TRUE REEL SLOT MACHINE - Pure RNG from physical reel strips with WILD NERF.
     
@@ -2072,39 +2218,44 @@ def calculate_slot_result(bet_per_line: float, active_lines: List[int], slot_id:
     3. Visible rows are consecutive symbols from that position
     4. Paylines are evaluated for full-line matches only
     5. No manipulation - pure probability determines wins
+    
+    Pass a seeded random.Random as rng to replay the same spins (RTP checks).
     """
     config = SLOT_CONFIGS.get(slot_id, SLOT_CONFIGS["classic"])
     symbols = config["symbols"]
     reels_count = config["reels"]  # 4
     rows_count = config["rows"]    # 4
-    reel_distributions = config.get("reel_distributions", None)
+    reel_cdfs = config.get("reel_cdfs", None)
     
     # Step 1: Generate grid using TRUE reel logic with Wild nerf mechanic
-    if slot_id == "classic" and reel_distributions:
+    if slot_id == "classic" and reel_cdfs:
         # Use Wild nerf for classic slot (main game)
-        grid = generate_random_grid_with_wild_nerf(symbols, rows_count, reels_count, reel_distributions)
+        grid = generate_random_grid_with_wild_nerf(symbols, rows_count, reels_count, reel_cdfs, rng)
     else:
         # Use standard generation for other slots
-        reel_strips = config.get("reel_strips", None)
-        grid = generate_random_grid(symbols, rows_count, reels_count, reel_strips)
+        reel_strip_cdfs = config.get("reel_strip_cdfs", None)
+        grid = generate_random_grid(symbols, rows_count, reels_count, reel_strip_cdfs, rng)
     
     # Step 2: Evaluate all active paylines for FULL-LINE wins only
-    winning_paylines = validate_all_paylines(grid, active_lines, symbols)
+    winning_paylines = validate_all_paylines(grid, active_lines, symbols, config["wild_symbols"])
     
-    # Step 3: Calculate total bet and winnings
-    total_bet = round(bet_per_line * len(active_lines), 2)
-    total_win = 0.0
+    # Step 3: Calculate total bet and winnings in integer cents (half rounds up)
+    bet_per_line_cents = round(bet_per_line * 100)
+    multipliers_x100 = config["multipliers_x100"]
+    total_win_cents = 0
     
     # Calculate payout for each winning payline
     for wp in winning_paylines:
-        line_payout = round(bet_per_line * wp["multiplier"], 2)
-        wp["payout"] = line_payout
-        total_win += line_payout
+        line_payout_cents = (bet_per_line_cents * multipliers_x100.get(wp["symbol"], 100) + 50) // 100
+        wp["payout"] = line_payout_cents / 100
+        total_win_cents += line_payout_cents
     
-    total_win = round(total_win, 2)
+    total_bet_cents = bet_per_line_cents * len(active_lines)
+    total_bet = total_bet_cents / 100
+    total_win = total_win_cents / 100
     
-    # Jackpot threshold: total win must be >= 20x total bet
-    is_jackpot = total_win >= (total_bet * 20)
+    # Jackpot threshold: total win must be >= 20x total bet (compared in cents)
+    is_jackpot = total_win_cents >= total_bet_cents * 20
     
     return {
         "reels": grid,
@@ -2128,6 +2279,16 @@ def calculate_xp(bet_amount: float) -> int:
     xp = int(bet_amount * XP_PER_G)
     return max(0, xp)
 
+def extend_level_table(total_xp: int) -> None:
+    """
+    Append levels beyond the predefined list to LEVEL_CUMULATIVE_XP until the
+    table reaches past total_xp. Each extra level requires ~10% more XP than
+    the previous one.
+    """
+    while LEVEL_CUMULATIVE_XP[-1] <= total_xp:
+        last_req = LEVEL_CUMULATIVE_XP[-1] - LEVEL_CUMULATIVE_XP[-2]
+        LEVEL_CUMULATIVE_XP.append(LEVEL_CUMULATIVE_XP[-1] + int(last_req * 1.1))
+
 def calculate_level(total_xp: int) -> int:
     """
     Calculate level based on total XP using progressive requirements.
@@ -2137,46 +2298,23 @@ def calculate_level(total_xp: int) -> int:
     if total_xp < 0:
         total_xp = 0
     
-    level = 1
-    cumulative_xp = 0
+    if total_xp >= LEVEL_CUMULATIVE_XP[-1]:
+        extend_level_table(total_xp)
     
-    # Check against predefined level requirements
-    for i in range(1, len(LEVEL_XP_REQUIREMENTS)):
-        cumulative_xp += LEVEL_XP_REQUIREMENTS[i]
-        if total_xp >= cumulative_xp:
-            level = i + 1
-        else:
-            break
-    
-    # For levels beyond the predefined list, continue with scaling formula
-    if level >= len(LEVEL_XP_REQUIREMENTS):
-        # Continue scaling: each level requires ~10% more XP than previous
-        last_req = LEVEL_XP_REQUIREMENTS[-1]
-        extra_levels = 0
-        while cumulative_xp <= total_xp:
-            extra_levels += 1
-            last_req = int(last_req * 1.1)
-            cumulative_xp += last_req
-        level = len(LEVEL_XP_REQUIREMENTS) - 1 + extra_levels
-    
-    return level
+    # Number of level thresholds reached (level 1 starts at 0 XP)
+    return bisect_right(LEVEL_CUMULATIVE_XP, total_xp)
 
 def get_xp_for_next_level(current_level: int, current_xp: int) -> dict:
     """Get XP progress info for the current level"""
-    if current_level < len(LEVEL_XP_REQUIREMENTS):
-        # Calculate cumulative XP needed for current level
-        cumulative_for_current = sum(LEVEL_XP_REQUIREMENTS[1:current_level])
-        xp_needed_for_next = LEVEL_XP_REQUIREMENTS[current_level] if current_level < len(LEVEL_XP_REQUIREMENTS) else int(LEVEL_XP_REQUIREMENTS[-1] * 1.1)
-        xp_into_level = current_xp - cumulative_for_current
-    else:
-        # Beyond predefined levels
-        cumulative = sum(LEVEL_XP_REQUIREMENTS[1:])
-        last_req = LEVEL_XP_REQUIREMENTS[-1]
-        for i in range(len(LEVEL_XP_REQUIREMENTS), current_level):
-            last_req = int(last_req * 1.1)
-            cumulative += last_req
-        xp_needed_for_next = int(last_req * 1.1)
-        xp_into_level = current_xp - cumulative
+    current_level = max(1, current_level)
+    
+    # Make sure the table has the start of the next level too
+    while len(LEVEL_CUMULATIVE_XP) <= current_level:
+        extend_level_table(LEVEL_CUMULATIVE_XP[-1])
+    
+    cumulative_for_current = LEVEL_CUMULATIVE_XP[current_level - 1]
+    xp_needed_for_next = LEVEL_CUMULATIVE_XP[current_level] - cumulative_for_current
+    xp_into_level = current_xp - cumulative_for_current
     
     return {
         "current_xp": current_xp,
@@ -2208,13 +2346,15 @@ async def get_user_stats_from_history(user_id: str) -> dict:
         }}
     ]
 
-    result = await db.bet_history.aggregate(pipeline).to_list(1)
-
     # Net profit from account_activity_history (includes everything: slots, jackpot,
-    # wheel, admin grants, quests, chest rewards, item sales/purchases, trades)
-    last_activity = await db.account_activity_history.find_one(
-        {"user_id": user_id},
-        sort=[("event_number", -1)]
+    # wheel, admin grants, quests, chest rewards, item sales/purchases, trades).
+    # Both reads are independent, so issue them concurrently.
+    result, last_activity = await asyncio.gather(
+        db.bet_history.aggregate(pipeline).to_list(1),
+        db.account_activity_history.find_one(
+            {"user_id": user_id},
+            sort=[("event_number", -1)]
+        )
     )
     net_profit = round(last_activity["cumulative_profit"], 2) if last_activity else 0.0
 
@@ -2240,6 +2380,44 @@ async def get_user_stats_from_history(user_id: str) -> dict:
         "total_losses": 0
     }
 
+async def get_leaderboard_stats(user_ids: List[str]) -> Dict[str, dict]:
+    """Batched get_user_stats_from_history for the leaderboard columns (total_wins,
+    total_wagered, net_profit) - two aggregations for all users instead of two queries each.
+    """
+    if not user_ids:
+        return {}
+    
+    bet_pipeline = [
+        {"$match": {"user_id": {"$in": user_ids}, "game_type": {"$ne": "wheel"}}},  # Exclude free wheel spins
+        {"$group": {
+            "_id": "$user_id",
+            "total_wagered": {"$sum": {"$cond": [{"$eq": ["$transaction_type", "bet"]}, "$bet_amount", 0]}},
+            "wins": {"$sum": {"$cond": [{"$eq": ["$transaction_type", "win"]}, 1, 0]}}
+        }}
+    ]
+    # Latest cumulative_profit per user (same source as get_user_stats_from_history)
+    profit_pipeline = [
+        {"$match": {"user_id": {"$in": user_ids}}},
+        {"$sort": {"user_id": 1, "event_number": -1}},
+        {"$group": {"_id": "$user_id", "cumulative_profit": {"$first": "$cumulative_profit"}}}
+    ]
+    bet_rows, profit_rows = await asyncio.gather(
+        db.bet_history.aggregate(bet_pipeline).to_list(None),
+        db.account_activity_history.aggregate(profit_pipeline).to_list(None)
+    )
+    bets_by_user = {row["_id"]: row for row in bet_rows}
+    profit_by_user = {row["_id"]: row["cumulative_profit"] for row in profit_rows}
+    
+    stats = {}
+    for user_id in user_ids:
+        bets = bets_by_user.get(user_id, {})
+        stats[user_id] = {
+            "total_wins": bets.get("wins", 0),
+            "total_wagered": round(bets.get("total_wagered", 0), 2),
+            "net_profit": round(profit_by_user.get(user_id, 0.0), 2)
+        }
+    return stats
+
 async def send_discord_webhook(event_type: str, data: dict):
     """Send Discord webhook for big wins and level-ups"""
     if not DISCORD_WEBHOOK_URL:
@@ -2256,11 +2434,10 @@ async def send_discord_webhook(event_type: str, data: dict):
             "timestamp": datetime.now(timezone.utc).isoformat()
         }
         
-        async with httpx.AsyncClient() as http_client:
-            await http_client.post(
-                DISCORD_WEBHOOK_URL,
-                json={"embeds": [embed]}
-            )
+        await HTTP_CLIENT.post(
+            DISCORD_WEBHOOK_URL,
+            json={"embeds": [embed]}
+        )
     except Exception as e:
         logging.error(f"Discord webhook error: {e}")
 
@@ -2303,21 +2480,12 @@ async def register(request: Request, user_data: UserCreate):
     # Auto-generate email from username if not provided
     email = user_data.email if user_data.email else f"{user_data.username.lower()}@goladium.local"
     
-    existing = await db.users.find_one({"email": email}, {"_id": 0})
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    
-    existing_username = await db.users.find_one({"username": user_data.username}, {"_id": 0})
-    if existing_username:
-        raise HTTPException(status_code=400, detail="Username already taken")
-    
     user_id = f"user_{uuid.uuid4().hex[:12]}"
-    hashed_password = pwd_context.hash(user_data.password)
+    # bcrypt is deliberately slow - keep it off the event loop
+    hashed_password = await asyncio.to_thread(pwd_context.hash, user_data.password)
     
     # Assign a random default jackpot pattern for new users
-    import random
-    default_patterns = ["default_lightblue", "default_pink", "default_red", "default_orange", "default_yellow"]
-    assigned_pattern = random.choice(default_patterns)
+    assigned_pattern = secrets.choice(DEFAULT_JACKPOT_PATTERNS)
     
     now = datetime.now(timezone.utc)
     user_doc = {
@@ -2339,11 +2507,28 @@ async def register(request: Request, user_data: UserCreate):
         "active_tag": None,
         "active_name_color": None,
         "active_jackpot_pattern": assigned_pattern,  # Default pattern assigned
-        "created_at": now.isoformat(),
+        "created_at": now,
         "last_wheel_spin": None
     }
     
-    await db.users.insert_one(user_doc)
+    if not users_unique_indexes_ready:
+        # Unique indexes missing (see initialize_item_system) - check before inserting instead
+        existing = await db.users.find_one(
+            {"$or": [{"email": email}, {"username": user_data.username}]},
+            {"_id": 0, "email": 1}
+        )
+        if existing:
+            if existing.get("email") == email:
+                raise HTTPException(status_code=400, detail="Email already registered")
+            raise HTTPException(status_code=400, detail="Username already taken")
+    
+    # Uniqueness is enforced by the users.email / users.username unique indexes
+    try:
+        await db.users.insert_one(user_doc)
+    except DuplicateKeyError as e:
+        if "email" in (e.details or {}).get("keyPattern", {}):
+            raise HTTPException(status_code=400, detail="Email already registered")
+        raise HTTPException(status_code=400, detail="Username already taken")
     
     token = create_jwt_token(user_id)
     
@@ -2404,7 +2589,8 @@ async def login(credentials: UserLogin, request: Request):
     # 🔒 BAN CHECK (time-based)
     check_user_banned(user)
     
-    if not pwd_context.verify(credentials.password, user.get("password_hash", "")):
+    # bcrypt is deliberately slow - keep it off the event loop
+    if not await asyncio.to_thread(pwd_context.verify, credentials.password, user.get("password_hash", "")):
         raise HTTPException(status_code=401, detail="Invalid username or password")
     
     token = create_jwt_token(user["user_id"])
@@ -2420,13 +2606,18 @@ async def login(credentials: UserLogin, request: Request):
     current_level = user.get("level", 1)
     xp_progress = get_xp_for_next_level(current_level, current_xp)
     
+    # Stored as BSON dates (naive UTC on read)
     created_at = user.get("created_at")
-    if isinstance(created_at, str):
+    if isinstance(created_at, str):  # Legacy ISO string
         created_at = datetime.fromisoformat(created_at)
+    if created_at and created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
     
     last_wheel = user.get("last_wheel_spin")
-    if isinstance(last_wheel, str):
+    if isinstance(last_wheel, str):  # Legacy ISO string
         last_wheel = datetime.fromisoformat(last_wheel)
+    if last_wheel and last_wheel.tzinfo is None:
+        last_wheel = last_wheel.replace(tzinfo=timezone.utc)
     
     user_response = UserResponse(
         user_id=user["user_id"],
@@ -2462,16 +2653,15 @@ async def get_session_from_google(request: Request, response: Response):
     if not session_id:
         raise HTTPException(status_code=400, detail="Missing session ID")
     
-    async with httpx.AsyncClient() as http_client:
-        auth_response = await http_client.get(
-            "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
-            headers={"X-Session-ID": session_id}
-        )
-        
-        if auth_response.status_code != 200:
-            raise HTTPException(status_code=401, detail="Invalid session")
-        
-        google_data = auth_response.json()
+    auth_response = await HTTP_CLIENT.get(
+        "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
+        headers={"X-Session-ID": session_id}
+    )
+    
+    if auth_response.status_code != 200:
+        raise HTTPException(status_code=401, detail="Invalid session")
+    
+    google_data = auth_response.json()
     
     email = google_data.get("email")
     if not email:
@@ -2484,67 +2674,69 @@ async def get_session_from_google(request: Request, response: Response):
     # This ensures we have full control over the session
     session_token = secrets.token_urlsafe(32)
     
-    existing_user = await db.users.find_one({"email": email}, {"_id": 0})
-    
     now = datetime.now(timezone.utc)
     
-    if existing_user:
-        user_id = existing_user["user_id"]
-        if picture:
-            await db.users.update_one(
-                {"user_id": user_id},
-                {"$set": {"avatar": picture}}
-            )
-    else:
-        user_id = f"user_{uuid.uuid4().hex[:12]}"
-        username = name.replace(" ", "_").lower()[:20] + "_" + uuid.uuid4().hex[:4]
-        
-        user_doc = {
-            "user_id": user_id,
-            "email": email,
-            "username": username,
-            "password_hash": None,
-            "balance": 10.0,
-            "level": 1,
-            "xp": 0,
-            "total_wagered": 0.0,
-            "avatar": picture,
-            "vip_status": None,
-            "name_color": None,
-            "badge": None,
-            "frame": None,
-            "balance_a": 0.0,
-            "active_tag": None,
-            "active_name_color": None,
-            "active_jackpot_pattern": None,
-            "created_at": now.isoformat(),
-            "last_wheel_spin": None
-        }
-        
-        await db.users.insert_one(user_doc)
+    # Fields for a first-time Google user (email comes from the upsert filter)
+    new_user_fields = {
+        "user_id": f"user_{uuid.uuid4().hex[:12]}",
+        "username": name.replace(" ", "_").lower()[:20] + "_" + uuid.uuid4().hex[:4],
+        "password_hash": None,
+        "balance": 10.0,
+        "level": 1,
+        "xp": 0,
+        "total_wagered": 0.0,
+        "avatar": picture,
+        "vip_status": None,
+        "name_color": None,
+        "badge": None,
+        "frame": None,
+        "balance_a": 0.0,
+        "active_tag": None,
+        "active_name_color": None,
+        "active_jackpot_pattern": None,
+        "created_at": now,
+        "last_wheel_spin": None
+    }
+    
+    # Create the user or refresh an existing user's avatar in one round-trip
+    user_update = {"$setOnInsert": new_user_fields}
+    if picture:
+        new_user_fields.pop("avatar")
+        user_update["$set"] = {"avatar": picture}
+    
+    user = await db.users.find_one_and_update(
+        {"email": email},
+        user_update,
+        projection={"_id": 0},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    user_id = user["user_id"]
     
     expires_at = now + timedelta(days=7)
     
-    # Store session with the token as primary key for fast lookup
-    await db.user_sessions.update_one(
-        {"session_token": session_token},
-        {
-            "$set": {
-                "user_id": user_id,
-                "session_token": session_token,
-                "expires_at": expires_at.isoformat(),
-                "created_at": now.isoformat()
-            }
-        },
-        upsert=True
+    await asyncio.gather(
+        # Store session with the token as primary key for fast lookup
+        db.user_sessions.update_one(
+            {"session_token": session_token},
+            {
+                "$set": {
+                    "user_id": user_id,
+                    "session_token": session_token,
+                    "expires_at": expires_at,  # BSON date, pruned by the TTL index
+                    "created_at": now
+                }
+            },
+            upsert=True
+        ),
+        # Also drop this user's other sessions (one OAuth session per user;
+        # expired ones are pruned by the TTL index either way)
+        db.user_sessions.delete_many({
+            "user_id": user_id,
+            "session_token": {"$ne": session_token}
+        })
     )
     
-    # Also clean up any old sessions for this user
-    await db.user_sessions.delete_many({
-        "user_id": user_id,
-        "session_token": {"$ne": session_token}
-    })
-    
     # Use oauth_session cookie (separate from any JWT tokens)
     response.set_cookie(
         key="oauth_session",
@@ -2556,16 +2748,20 @@ async def get_session_from_google(request: Request, response: Response):
         path="/"
     )
     
-    user = await db.users.find_one({"user_id": user_id}, {"_id": 0})
     stats = await get_user_stats_from_history(user_id)
     
+    # Stored as BSON dates (naive UTC on read)
     created_at = user.get("created_at")
-    if isinstance(created_at, str):
+    if isinstance(created_at, str):  # Legacy ISO string
         created_at = datetime.fromisoformat(created_at)
+    if created_at and created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
     
     last_wheel = user.get("last_wheel_spin")
-    if isinstance(last_wheel, str):
+    if isinstance(last_wheel, str):  # Legacy ISO string
         last_wheel = datetime.fromisoformat(last_wheel)
+    if last_wheel and last_wheel.tzinfo is None:
+        last_wheel = last_wheel.replace(tzinfo=timezone.utc)
     
     return {
         "user_id": user["user_id"],
@@ -2602,13 +2798,18 @@ async def get_current_user_info(request: Request):
     current_level = user.get("level", 1)
     xp_progress = get_xp_for_next_level(current_level, current_xp)
     
+    # Stored as BSON dates (naive UTC on read)
     created_at = user.get("created_at")
-    if isinstance(created_at, str):
+    if isinstance(created_at, str):  # Legacy ISO string
         created_at = datetime.fromisoformat(created_at)
+    if created_at and created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
     
     last_wheel = user.get("last_wheel_spin")
-    if isinstance(last_wheel, str):
+    if isinstance(last_wheel, str):  # Legacy ISO string
         last_wheel = datetime.fromisoformat(last_wheel)
+    if last_wheel and last_wheel.tzinfo is None:
+        last_wheel = last_wheel.replace(tzinfo=timezone.utc)
     
     return {
         "user_id": user["user_id"],
@@ -2658,21 +2859,52 @@ async def logout(request: Request, response: Response):
 
 # ============== USER AVATAR ENDPOINTS ==============
 
+# Max 5MB original = ~6.7MB base64 (base64 is ~33% larger than the image)
+AVATAR_MAX_BASE64_LENGTH = 7 * 1024 * 1024
+# Room for the JSON envelope around the data URL when checking Content-Length
+AVATAR_MAX_REQUEST_BYTES = AVATAR_MAX_BASE64_LENGTH + 1024
+
 class AvatarUpdate(BaseModel):
     avatar: str  # Base64 encoded image
 
+async def read_avatar_update(request: Request) -> AvatarUpdate:
+    """Read the upload body with a size cap, so oversized images are rejected before parsing.
+    
+    Checks the declared Content-Length first, then counts streamed bytes for chunked uploads.
+    """
+    too_large = HTTPException(status_code=400, detail="Image too large (max 5MB)")
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > AVATAR_MAX_REQUEST_BYTES:
+        raise too_large
+    
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > AVATAR_MAX_REQUEST_BYTES:
+            raise too_large
+    
+    try:
+        payload = orjson.loads(body)
+    except orjson.JSONDecodeError as e:
+        raise RequestValidationError([{"type": "json_invalid", "loc": ("body", e.pos), "msg": "JSON decode error", "input": {}, "ctx": {"error": e.msg}}])
+    try:
+        return AvatarUpdate.model_validate(payload)
+    except ValidationError as e:
+        raise RequestValidationError([{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)])
+
 @api_router.post("/user/avatar")
-async def update_avatar(avatar_data: AvatarUpdate, request: Request):
+async def update_avatar(request: Request):
     """Update user's profile picture"""
     user = await get_current_user(request)
+    avatar_data = await read_avatar_update(request)
     
     # Validate base64 image (should start with data:image/)
     if not avatar_data.avatar.startswith('data:image/'):
         raise HTTPException(status_code=400, detail="Invalid image format")
     
     # Check size (rough estimate - base64 is ~33% larger than original)
-    # Max 5MB original = ~6.7MB base64
-    if len(avatar_data.avatar) > 7 * 1024 * 1024:
+    # Oversized request bodies are already rejected by read_avatar_update
+    if len(avatar_data.avatar) > AVATAR_MAX_BASE64_LENGTH:
         raise HTTPException(status_code=400, detail="Image too large (max 5MB)")
     
     await db.users.update_one(
@@ -2696,9 +2928,8 @@ async def delete_avatar(request: Request):
 
 # ============== SLOT GAME ENDPOINTS ==============
 
-@api_router.get("/games/slots")
-async def get_available_slots():
-    """Get all available slot machines"""
+def build_slot_list_payload() -> list:
+    """Public summary of every slot machine (static, see SLOT_LIST_JSON)"""
     slots = []
     for slot_id, config in SLOT_CONFIGS.items():
         slots.append({
@@ -2713,13 +2944,8 @@ async def get_available_slots():
         })
     return slots
 
-@api_router.get("/games/slot/{slot_id}/info")
-async def get_slot_info(slot_id: str):
-    """Get slot machine info and payout table with per-reel probability data"""
-    config = SLOT_CONFIGS.get(slot_id)
-    if not config:
-        raise HTTPException(status_code=404, detail="Slot not found")
-    
+def build_slot_info_payload(slot_id: str, config: dict) -> dict:
+    """Slot machine info and payout table with per-reel probability data (static, see SLOT_INFO_JSON)"""
     symbols = config["symbols"]
     reel_distributions = config.get("reel_distributions", {})
     
@@ -2763,7 +2989,7 @@ async def get_slot_info(slot_id: str):
         "min_bet_per_line": 0.01,
         "max_bet_per_line": None,  # No upper limit - constrained by user balance only
         "line_presets": LINE_PRESETS,
-        "paylines": PAYLINES_4x4,
+        "paylines": {line_num: path for line_num, path in enumerate(PAYLINES_4x4, 1)},
         "rules": {
             "how_to_win": "Match ALL 4 symbols on an active payline",
             "wilds": "Wild symbols substitute for any regular symbol",
@@ -2771,6 +2997,28 @@ async def get_slot_info(slot_id: str):
         }
     }
 
+# Slot configs never change at runtime, so both payloads are serialized once
+SLOT_LIST_JSON, SLOT_LIST_ETAG = precompute_json(build_slot_list_payload())
+SLOT_INFO_JSON = {
+    slot_id: precompute_json(build_slot_info_payload(slot_id, config))
+    for slot_id, config in SLOT_CONFIGS.items()
+}
+
+@api_router.get("/games/slots")
+async def get_available_slots(request: Request):
+    """Get all available slot machines"""
+    return static_json_response(request, SLOT_LIST_JSON, SLOT_LIST_ETAG)
+
+@api_router.get("/games/slot/{slot_id}/info")
+async def get_slot_info(slot_id: str, request: Request):
+    """Get slot machine info and payout table with per-reel probability data"""
+    slot_info = SLOT_INFO_JSON.get(slot_id)
+    if not slot_info:
+        raise HTTPException(status_code=404, detail="Slot not found")
+    
+    body, etag = slot_info
+    return static_json_response(request, body, etag)
+
 @api_router.post("/games/slot/spin", response_model=SlotResult)
 async def spin_slot(bet_request: SlotBetRequest, request: Request):
     user = await get_current_user(request)
@@ -2782,9 +3030,11 @@ async def spin_slot(bet_request: SlotBetRequest, request: Request):
     # Validate slot exists
     if slot_id not in SLOT_CONFIGS:
         raise HTTPException(status_code=400, detail="Invalid slot machine")
+    slot_config = SLOT_CONFIGS[slot_id]
+    slot_name = slot_config["name"]
     
     # Validate active lines
-    max_lines = SLOT_CONFIGS[slot_id]["max_paylines"]
+    max_lines = slot_config["max_paylines"]
     if not active_lines or len(active_lines) == 0:
         raise HTTPException(status_code=400, detail="At least 1 payline must be active")
     
@@ -2845,14 +3095,14 @@ async def spin_slot(bet_request: SlotBetRequest, request: Request):
         "details": {
             "bet_per_line": bet_per_line,
             "active_lines": active_lines,
-            "slot_name": SLOT_CONFIGS[slot_id]["name"]
+            "slot_name": slot_name
         }
     }
-    await db.bet_history.insert_one(bet_entry)
+    history_entries = [bet_entry]
     
     # Entry 2: The win (only if there's a win > 0)
     if win_amount > 0:
-        win_entry = {
+        history_entries.append({
             "bet_id": f"win_{uuid.uuid4().hex[:12]}",
             "user_id": user["user_id"],
             "timestamp": timestamp_win,  # Slightly later than bet
@@ -2865,31 +3115,29 @@ async def spin_slot(bet_request: SlotBetRequest, request: Request):
                 "reels": result["reels"],
                 "winning_paylines": result["winning_paylines"],
                 "is_jackpot": result["is_jackpot"],
-                "slot_name": SLOT_CONFIGS[slot_id]["name"],
+                "slot_name": slot_name,
                 "multiplier": round(win_amount / total_bet, 2) if total_bet > 0 else 0
             }
-        }
-        await db.bet_history.insert_one(win_entry)
-    
-    # Record value snapshot after balance change
-    await record_value_snapshot(user["user_id"], new_balance, user.get("balance_a", 0), "slot_spin")
+        })
     
-    # Record event-based account activity (profit/loss)
+    # The remaining writes are independent of each other, so run them concurrently
     net_change = win_amount - total_bet
-    slot_name = SLOT_CONFIGS[slot_id]["name"]
-    await record_account_activity(
-        user_id=user["user_id"],
-        event_type="slot",
-        amount=net_change,
-        source=f"Slot: {slot_name}",
-        details={"bet": total_bet, "win": win_amount, "slot_id": slot_id}
-    )
-    
-    # Update quest progress
-    await update_quest_progress(user["user_id"], "spins", 1, bet_amount=total_bet)
-    await update_quest_progress(user["user_id"], "total_wagered", int(total_bet))
-    if result["is_win"]:
-        await update_quest_progress(user["user_id"], "wins", 1, bet_amount=total_bet)
+    spin_writes = [
+        # One round-trip for both entries; ordered keeps the bet inserted before the win
+        db.bet_history.insert_many(history_entries, ordered=True),
+        # Record value snapshot after balance change
+        record_value_snapshot(user["user_id"], new_balance, user.get("balance_a", 0), "slot_spin"),
+        # Record event-based account activity (profit/loss)
+        record_account_activity(
+            user_id=user["user_id"],
+            event_type="slot",
+            amount=net_change,
+            source=f"Slot: {slot_name}",
+            details={"bet": total_bet, "win": win_amount, "slot_id": slot_id}
+        ),
+        # Update quest progress
+        update_slot_spin_quests(user["user_id"], total_bet, result["is_win"])
+    ]
     
     # Record big wins (>= 100 G or multiplier > 5x) to live feed
     _multiplier = round(win_amount / total_bet, 2) if total_bet > 0 else 0
@@ -2898,38 +3146,40 @@ async def spin_slot(bet_request: SlotBetRequest, request: Request):
             {"symbol": p["symbol"], "count": p["match_count"]}
             for p in result.get("winning_paylines", [])
         ]
-        await record_big_win(
+        spin_writes.append(record_big_win(
             user=user,
             game_type="slot",
             bet_amount=total_bet,
             win_amount=win_amount,
             slot_id=slot_id,
-            slot_name=SLOT_CONFIGS[slot_id]["name"],
+            slot_name=slot_name,
             multiplier=_multiplier,
             winning_symbols=_winning_symbols
-        )
+        ))
     
-    # Discord webhooks for big wins
+    await asyncio.gather(*spin_writes)
+    
+    # Discord webhooks for big wins (fire-and-forget, the response doesn't wait on Discord)
     if result["is_jackpot"]:
-        await send_discord_webhook("JACKPOT WIN!", {
+        spawn_background_task(send_discord_webhook("JACKPOT WIN!", {
             "Player": user["username"],
-            "Slot": SLOT_CONFIGS[slot_id]["name"],
+            "Slot": slot_name,
             "Bet": f"{total_bet} G",
             "Win": f"{win_amount} G"
-        })
+        }))
     elif result["is_win"] and win_amount >= total_bet * 10:
-        await send_discord_webhook("Big Win!", {
+        spawn_background_task(send_discord_webhook("Big Win!", {
             "Player": user["username"],
-            "Slot": SLOT_CONFIGS[slot_id]["name"],
+            "Slot": slot_name,
             "Bet": f"{total_bet} G",
             "Win": f"{win_amount} G"
-        })
+        }))
     
     if new_level > old_level:
-        await send_discord_webhook("Level Up!", {
+        spawn_background_task(send_discord_webhook("Level Up!", {
             "Player": user["username"],
             "New Level": new_level
-        })
+        }))
     
     # Convert winning_paylines to PaylineWin objects
     payline_wins = []
@@ -2961,6 +3211,11 @@ async def get_classic_slot_info():
 
 # ============== LUCKY WHEEL ENDPOINTS ==============
 
+# Lucky wheel probabilities: 1% = 15G, 24% = 5G, 75% = 1G.
+# A roll in [0, 100) lands on the first band whose upper bound is above it.
+WHEEL_BAND_BOUNDS = (1.0, 25.0)
+WHEEL_REWARDS = ((15.0, "jackpot"), (5.0, "high"), (1.0, "standard"))  # (reward, reward_tier) per band
+
 @api_router.post("/games/wheel/spin", response_model=WheelSpinResult)
 async def spin_lucky_wheel(request: Request):
     user = await get_current_user(request)
@@ -2969,7 +3224,7 @@ async def spin_lucky_wheel(request: Request):
     now = datetime.now(timezone.utc)
     
     if last_spin:
-        if isinstance(last_spin, str):
+        if isinstance(last_spin, str):  # Legacy ISO string
             last_spin = datetime.fromisoformat(last_spin)
         if last_spin.tzinfo is None:
             last_spin = last_spin.replace(tzinfo=timezone.utc)
@@ -2982,15 +3237,8 @@ async def spin_lucky_wheel(request: Request):
                 detail=f"Wheel on cooldown. Next spin available at {next_available.isoformat()}"
             )
     
-    # Lucky wheel probabilities: 75% = 1G, 24% = 5G, 1% = 15G
-    rand = random.random() * 100
-    
-    if rand < 1:
-        reward = 15.0
-    elif rand < 25:
-        reward = 5.0
-    else:
-        reward = 1.0
+    # Roll the wheel (see WHEEL_BAND_BOUNDS for the odds)
+    reward, reward_tier = WHEEL_REWARDS[bisect_right(WHEEL_BAND_BOUNDS, random.random() * 100)]
     
     new_balance = round(user["balance"] + reward, 2)
     next_spin = now + timedelta(minutes=5)
@@ -3001,7 +3249,7 @@ async def spin_lucky_wheel(request: Request):
         {
             "$set": {
                 "balance": new_balance,
-                "last_wheel_spin": now.isoformat()
+                "last_wheel_spin": now
             }
         }
     )
@@ -3012,7 +3260,7 @@ async def spin_lucky_wheel(request: Request):
         event_type="wheel",
         amount=reward,
         source="Lucky Wheel",
-        details={"reward_tier": "jackpot" if reward == 15 else "high" if reward == 5 else "standard"}
+        details={"reward_tier": reward_tier}
     )
     
     # Record history (marked as free/wheel type)
@@ -3025,7 +3273,7 @@ async def spin_lucky_wheel(request: Request):
         "result": "win",
         "win_amount": reward,
         "net_outcome": reward,
-        "details": {"reward_tier": "jackpot" if reward == 15 else "high" if reward == 5 else "standard"}
+        "details": {"reward_tier": reward_tier}
     }
     
     await db.bet_history.insert_one(bet_doc)
@@ -3050,7 +3298,7 @@ async def get_wheel_status(request: Request):
             "seconds_remaining": 0
         }
     
-    if isinstance(last_spin, str):
+    if isinstance(last_spin, str):  # Legacy ISO string
         last_spin = datetime.fromisoformat(last_spin)
     if last_spin.tzinfo is None:
         last_spin = last_spin.replace(tzinfo=timezone.utc)
@@ -3075,247 +3323,251 @@ async def get_wheel_status(request: Request):
 
 # ============== JACKPOT ENDPOINTS ==============
 
+def pick_jackpot_winner_index(participants: list, total_pot: float) -> int:
+    """Weighted draw: each participant's chance is bet_amount / total_pot.
+    
+    A linear scan with early exit - for at most JACKPOT_MAX_PARTICIPANTS rows this
+    beats building a cumulative array (bisect/numpy) on every draw.
+    """
+    rand = random.random() * total_pot
+    cumulative = 0
+    for idx, p in enumerate(participants):
+        cumulative += p["bet_amount"]
+        if rand <= cumulative:
+            return idx
+    # Float rounding of total_pot can leave rand just above the last cumulative sum
+    return len(participants) - 1
+
+async def settle_jackpot_bets(jackpot_id: str, participants: list, total_pot: float, winner_user_id: str, win_timestamp: str):
+    """Resolve every pending jackpot bet entry and add the winner's WIN entry in one bulk write."""
+    participant_count = len(participants)
+    winner = next(p for p in participants if p["user_id"] == winner_user_id)
+    pending_filter = {"game_type": "jackpot", "details.jackpot_id": jackpot_id, "result": "pending"}
+    completed_details = {
+        "details.status": "completed",
+        "details.total_pot": total_pot,
+        "details.participants": participant_count
+    }
+    
+    ops = [
+        # All losers get the same result; net_outcome comes from each entry's own bet_amount,
+        # so this is one pipeline update instead of one update per participant
+        UpdateMany(
+            {**pending_filter, "user_id": {"$ne": winner_user_id}},
+            [{"$set": {
+                "result": "loss",
+                "win_amount": 0,
+                "net_outcome": {"$subtract": [0, "$bet_amount"]},
+                **completed_details,
+                "details.is_winner": False
+            }}]
+        ),
+        # Update the winner's pending bet entry to final result
+        UpdateOne(
+            {**pending_filter, "user_id": winner_user_id},
+            {"$set": {
+                "result": "win",
+                "win_amount": total_pot,
+                "net_outcome": round(total_pot - winner["bet_amount"], 2),
+                **completed_details,
+                "details.is_winner": True
+            }}
+        ),
+        # Create separate WIN entry for the winner
+        InsertOne({
+            "bet_id": f"win_{uuid.uuid4().hex[:12]}",
+            "user_id": winner_user_id,
+            "game_type": "jackpot",
+            "transaction_type": "win",
+            "amount": total_pot,  # Positive for win
+            "win_amount": total_pot,
+            "timestamp": win_timestamp,  # Slightly later than bet
+            "details": {
+                "jackpot_id": jackpot_id,
+                "status": "won",
+                "total_pot": total_pot,
+                "participants": participant_count,
+                "bet_amount": winner["bet_amount"]
+            }
+        })
+    ]
+    
+    # The three writes touch disjoint entries, so let the server apply them unordered
+    await db.bet_history.bulk_write(ops, ordered=False)
+
 @api_router.get("/games/jackpot/status")
 async def get_jackpot_status():
     """Get current jackpot status"""
-    async with jackpot_lock:
-        now = datetime.now(timezone.utc)
-        
-        # Check if waiting period expired without second player
-        if jackpot_state["state"] == "waiting" and jackpot_state["countdown_end"]:
-            countdown_end = datetime.fromisoformat(jackpot_state["countdown_end"])
-            if countdown_end.tzinfo is None:
-                countdown_end = countdown_end.replace(tzinfo=timezone.utc)
+    now_ts = time.time()
+    
+    # Steady-state polls serve the snapshot published at the end of the last locked
+    # change. Take the lock only when an expired countdown may trigger the refund or
+    # the auto-spin; both branches re-check jackpot_state under it.
+    snapshot = jackpot_snapshot
+    countdown_end = snapshot["countdown_end"]
+    if countdown_end and now_ts >= countdown_end and snapshot["state"] in ("waiting", "active"):
+        async with jackpot_lock:
+            now = datetime.now(timezone.utc)
+            now_ts = now.timestamp()
             
-            if now >= countdown_end:
-                # Refund all participants and reset
-                for p in jackpot_state["participants"]:
-                    await db.users.update_one(
-                        {"user_id": p["user_id"]},
-                        {"$inc": {"balance": p["bet_amount"]}}
-                    )
-                
-                jackpot_state.update({
-                    "state": "idle",
-                    "jackpot_id": None,
-                    "participants": [],
-                    "total_pot": 0.0,
-                    "started_at": None,
-                    "countdown_end": None,
-                    "winner": None,
-                    "winner_index": None
-                })
+            # Check if waiting period expired without second player
+            if jackpot_state["state"] == "waiting" and jackpot_state["countdown_end"]:
+                countdown_end = jackpot_state["countdown_end"]
                 
-                return JackpotStatus(
-                    state="idle",
-                    total_pot=0.0,
-                    participants=[],
-                    countdown_seconds=None,
-                    winner=None,
-                    winner_index=None,
-                    jackpot_id=None,
-                    max_participants=JACKPOT_MAX_PARTICIPANTS,
-                    is_full=False
-                )
-        
-        # AUTO-SPIN: Check if active countdown expired with 2+ players
-        if jackpot_state["state"] == "active" and jackpot_state["countdown_end"]:
-            countdown_end = datetime.fromisoformat(jackpot_state["countdown_end"])
-            if countdown_end.tzinfo is None:
-                countdown_end = countdown_end.replace(tzinfo=timezone.utc)
+                if now_ts >= countdown_end:
+                    # Refund all participants in one round-trip and reset
+                    if jackpot_state["participants"]:
+                        await db.users.bulk_write([
+                            UpdateOne({"user_id": p["user_id"]}, {"$inc": {"balance": p["bet_amount"]}})
+                            for p in jackpot_state["participants"]
+                        ], ordered=False)
+                    
+                    jackpot_state.update({
+                        "state": "idle",
+                        "jackpot_id": None,
+                        "participants": [],
+                        "total_pot": 0.0,
+                        "started_at": None,
+                        "countdown_end": None,
+                        "winner": None,
+                        "winner_index": None
+                    })
+                    publish_jackpot_snapshot()
             
-            if now >= countdown_end and len(jackpot_state["participants"]) >= JACKPOT_MIN_PARTICIPANTS:
-                # Auto-trigger the spin
-                jackpot_state["state"] = "spinning"
+            # AUTO-SPIN: Check if active countdown expired with 2+ players
+            if jackpot_state["state"] == "active" and jackpot_state["countdown_end"]:
+                countdown_end = jackpot_state["countdown_end"]
                 
-                # Weighted random selection
-                total = jackpot_state["total_pot"]
-                rand = random.random() * total
-                cumulative = 0
-                winner = None
-                winner_index = 0
-                
-                for idx, p in enumerate(jackpot_state["participants"]):
-                    cumulative += p["bet_amount"]
-                    if rand <= cumulative:
-                        winner = p
-                        winner_index = idx
-                        break
-                
-                if not winner:
-                    winner = jackpot_state["participants"][-1]
-                    winner_index = len(jackpot_state["participants"]) - 1
-                
-                # Store winner_index for frontend animation
-                jackpot_state["winner_index"] = winner_index
-                
-                # Award winner
-                await db.users.update_one(
-                    {"user_id": winner["user_id"]},
-                    {"$inc": {"balance": jackpot_state["total_pot"]}}
-                )
-                
-                # Update bet_history for ALL participants (update pending entries)
-                win_timestamp = (now + timedelta(milliseconds=1)).isoformat()
-                for p in jackpot_state["participants"]:
-                    is_winner = p["user_id"] == winner["user_id"]
-                    win_amount = jackpot_state["total_pot"] if is_winner else 0
+                if now_ts >= countdown_end and len(jackpot_state["participants"]) >= JACKPOT_MIN_PARTICIPANTS:
+                    # Auto-trigger the spin
+                    jackpot_state["state"] = "spinning"
+                    
+                    # Weighted random selection
+                    total = jackpot_state["total_pot"]
+                    winner_index = pick_jackpot_winner_index(jackpot_state["participants"], total)
+                    winner = jackpot_state["participants"][winner_index]
+                    
+                    # Store winner_index for frontend animation
+                    jackpot_state["winner_index"] = winner_index
                     
-                    # Update the pending bet entry to final result
-                    await db.bet_history.update_one(
-                        {
-                            "user_id": p["user_id"],
-                            "game_type": "jackpot",
-                            "details.jackpot_id": jackpot_state["jackpot_id"],
-                            "result": "pending"
-                        },
-                        {
-                            "$set": {
-                                "result": "win" if is_winner else "loss",
-                                "win_amount": win_amount,
-                                "net_outcome": round(win_amount - p["bet_amount"], 2),
-                                "details.status": "completed",
-                                "details.total_pot": jackpot_state["total_pot"],
-                                "details.participants": len(jackpot_state["participants"]),
-                                "details.is_winner": is_winner
-                            }
-                        }
+                    # Award winner
+                    await db.users.update_one(
+                        {"user_id": winner["user_id"]},
+                        {"$inc": {"balance": jackpot_state["total_pot"]}}
                     )
                     
-                    # Create separate WIN entry for the winner
-                    if is_winner:
-                        await db.bet_history.insert_one({
-                            "bet_id": f"win_{uuid.uuid4().hex[:12]}",
-                            "user_id": p["user_id"],
-                            "game_type": "jackpot",
-                            "transaction_type": "win",
-                            "amount": jackpot_state["total_pot"],
-                            "win_amount": jackpot_state["total_pot"],
-                            "timestamp": win_timestamp,
-                            "details": {
-                                "jackpot_id": jackpot_state["jackpot_id"],
-                                "status": "won",
-                                "total_pot": jackpot_state["total_pot"],
-                                "participants": len(jackpot_state["participants"]),
-                                "bet_amount": p["bet_amount"]
-                            }
-                        })
-                
-                # Record account activity for ALL jackpot participants
-                for p in jackpot_state["participants"]:
-                    is_winner = p["user_id"] == winner["user_id"]
-                    if is_winner:
-                        # Winner: net profit = pot - their bet
-                        net_amount = jackpot_state["total_pot"] - p["bet_amount"]
-                        await record_account_activity(
-                            user_id=p["user_id"],
-                            event_type="jackpot",
-                            amount=net_amount,
-                            source=f"Jackpot Win (Pot: {jackpot_state['total_pot']}G)",
-                            details={"bet": p["bet_amount"], "pot": jackpot_state["total_pot"], "result": "win"}
-                        )
-                    else:
-                        # Loser: lost their bet
-                        await record_account_activity(
-                            user_id=p["user_id"],
-                            event_type="jackpot",
-                            amount=-p["bet_amount"],
-                            source=f"Jackpot Loss (Pot: {jackpot_state['total_pot']}G)",
-                            details={"bet": p["bet_amount"], "pot": jackpot_state["total_pot"], "result": "loss"}
-                        )
-                
-                # Update quest progress for jackpot WIN
-                await update_quest_progress(
-                    winner["user_id"], 
-                    "jackpot_wins", 
-                    1, 
-                    pot_size=jackpot_state["total_pot"]
-                )
-                
-                # Record jackpot history
-                await db.jackpot_history.insert_one({
-                    "jackpot_id": jackpot_state["jackpot_id"],
-                    "winner_id": winner["user_id"],
-                    "winner_username": winner["username"],
-                    "total_pot": jackpot_state["total_pot"],
-                    "participants": jackpot_state["participants"],
-                    "timestamp": now.isoformat()
-                })
-                
-                # Record big win for jackpot (if >= 10 G)
-                win_chance = round(winner["bet_amount"] / total * 100, 2)
-                if jackpot_state["total_pot"] >= 100:
-                    winner_user = await db.users.find_one({"user_id": winner["user_id"]})
-                    if winner_user:
-                        await record_big_win(
-                            user=winner_user,
-                            game_type="jackpot",
-                            bet_amount=winner["bet_amount"],
-                            win_amount=jackpot_state["total_pot"],
-                            win_chance=win_chance
-                        )
-                
-                winner_data = JackpotParticipant(
-                    user_id=winner["user_id"],
-                    username=winner["username"],
-                    bet_amount=winner["bet_amount"],
-                    win_chance=win_chance,
-                    avatar=winner.get("avatar")
-                )
-                
-                jackpot_state["winner"] = winner_data
-                jackpot_state["state"] = "complete"
-                
-                # Reset after 10 seconds
-                async def reset_jackpot():
-                    await asyncio.sleep(10)
-                    async with jackpot_lock:
-                        if jackpot_state["state"] == "complete":
-                            jackpot_state.update({
-                                "state": "idle",
-                                "jackpot_id": None,
-                                "participants": [],
-                                "total_pot": 0.0,
-                                "started_at": None,
-                                "countdown_end": None,
-                                "winner": None,
-                                "winner_index": None
-                            })
-                
-                asyncio.create_task(reset_jackpot())
-        
-        # Calculate countdown
-        countdown_seconds = None
-        if jackpot_state["countdown_end"]:
-            countdown_end = datetime.fromisoformat(jackpot_state["countdown_end"])
-            if countdown_end.tzinfo is None:
-                countdown_end = countdown_end.replace(tzinfo=timezone.utc)
-            countdown_seconds = max(0, int((countdown_end - now).total_seconds()))
-        
-        # Update win chances
-        participants = []
-        for p in jackpot_state["participants"]:
-            win_chance = (p["bet_amount"] / jackpot_state["total_pot"] * 100) if jackpot_state["total_pot"] > 0 else 0
-            participants.append(JackpotParticipant(
-                user_id=p["user_id"],
-                username=p["username"],
-                bet_amount=p["bet_amount"],
-                win_chance=round(win_chance, 2),
-                avatar=p.get("avatar"),
-                jackpot_pattern=p.get("jackpot_pattern")
-            ))
-        
-        return JackpotStatus(
-            state=jackpot_state["state"],
-            total_pot=jackpot_state["total_pot"],
-            participants=participants,
-            countdown_seconds=countdown_seconds,
-            winner=jackpot_state.get("winner"),
-            winner_index=jackpot_state.get("winner_index"),
-            jackpot_id=jackpot_state.get("jackpot_id"),
-            max_participants=JACKPOT_MAX_PARTICIPANTS,
-            is_full=len(jackpot_state["participants"]) >= JACKPOT_MAX_PARTICIPANTS
-        )
+                    # Update bet_history for ALL participants (update pending entries)
+                    win_timestamp = (now + timedelta(milliseconds=1)).isoformat()
+                    await settle_jackpot_bets(
+                        jackpot_state["jackpot_id"], jackpot_state["participants"],
+                        jackpot_state["total_pot"], winner["user_id"], win_timestamp
+                    )
+                    
+                    # Record account activity for ALL jackpot participants
+                    for p in jackpot_state["participants"]:
+                        is_winner = p["user_id"] == winner["user_id"]
+                        if is_winner:
+                            # Winner: net profit = pot - their bet
+                            net_amount = jackpot_state["total_pot"] - p["bet_amount"]
+                            await record_account_activity(
+                                user_id=p["user_id"],
+                                event_type="jackpot",
+                                amount=net_amount,
+                                source=f"Jackpot Win (Pot: {jackpot_state['total_pot']}G)",
+                                details={"bet": p["bet_amount"], "pot": jackpot_state["total_pot"], "result": "win"}
+                            )
+                        else:
+                            # Loser: lost their bet
+                            await record_account_activity(
+                                user_id=p["user_id"],
+                                event_type="jackpot",
+                                amount=-p["bet_amount"],
+                                source=f"Jackpot Loss (Pot: {jackpot_state['total_pot']}G)",
+                                details={"bet": p["bet_amount"], "pot": jackpot_state["total_pot"], "result": "loss"}
+                            )
+                    
+                    # Update quest progress for jackpot WIN
+                    await update_quest_progress(
+                        winner["user_id"], 
+                        "jackpot_wins", 
+                        1, 
+                        pot_size=jackpot_state["total_pot"]
+                    )
+                    
+                    # Record jackpot history
+                    await db.jackpot_history.insert_one({
+                        "jackpot_id": jackpot_state["jackpot_id"],
+                        "winner_id": winner["user_id"],
+                        "winner_username": winner["username"],
+                        "total_pot": jackpot_state["total_pot"],
+                        "participants": jackpot_state["participants"],
+                        "timestamp": now.isoformat()
+                    })
+                    
+                    # Record big win for jackpot (if >= 10 G)
+                    win_chance = round(winner["bet_amount"] / total * 100, 2)
+                    if jackpot_state["total_pot"] >= 100:
+                        winner_user = await db.users.find_one({"user_id": winner["user_id"]})
+                        if winner_user:
+                            await record_big_win(
+                                user=winner_user,
+                                game_type="jackpot",
+                                bet_amount=winner["bet_amount"],
+                                win_amount=jackpot_state["total_pot"],
+                                win_chance=win_chance
+                            )
+                    
+                    winner_data = {
+                        "user_id": winner["user_id"],
+                        "username": winner["username"],
+                        "bet_amount": winner["bet_amount"],
+                        "win_chance": win_chance,
+                        "avatar": winner.get("avatar"),
+                        "jackpot_pattern": None
+                    }
+                    
+                    jackpot_state["winner"] = winner_data
+                    jackpot_state["state"] = "complete"
+                    
+                    # Reset after 10 seconds
+                    async def reset_jackpot():
+                        await asyncio.sleep(10)
+                        async with jackpot_lock:
+                            if jackpot_state["state"] == "complete":
+                                jackpot_state.update({
+                                    "state": "idle",
+                                    "jackpot_id": None,
+                                    "participants": [],
+                                    "total_pot": 0.0,
+                                    "started_at": None,
+                                    "countdown_end": None,
+                                    "winner": None,
+                                    "winner_index": None
+                                })
+                                publish_jackpot_snapshot()
+                    
+                    asyncio.create_task(reset_jackpot())
+                    publish_jackpot_snapshot()
+            
+            snapshot = jackpot_snapshot
+    
+    # Calculate countdown
+    countdown_seconds = None
+    if snapshot["countdown_end"]:
+        countdown_seconds = max(0, int(snapshot["countdown_end"] - now_ts))
+    
+    # Same shape as JackpotStatus
+    return orjson_response({
+        "state": snapshot["state"],
+        "total_pot": snapshot["total_pot"],
+        "participants": snapshot["participants"],
+        "countdown_seconds": countdown_seconds,
+        "winner": snapshot["winner"],
+        "winner_index": snapshot["winner_index"],
+        "jackpot_id": snapshot["jackpot_id"],
+        "max_participants": JACKPOT_MAX_PARTICIPANTS,
+        "is_full": snapshot["is_full"]
+    })
 
 @api_router.post("/games/jackpot/join")
 async def join_jackpot(join_request: JackpotJoinRequest, request: Request):
@@ -3398,13 +3650,14 @@ async def join_jackpot(join_request: JackpotJoinRequest, request: Request):
             # First player - start waiting period
             jackpot_state["state"] = "waiting"
             jackpot_state["started_at"] = now.isoformat()
-            jackpot_state["countdown_end"] = (now + timedelta(seconds=JACKPOT_WAIT_SECONDS)).isoformat()
+            jackpot_state["countdown_end"] = now.timestamp() + JACKPOT_WAIT_SECONDS
         
         elif jackpot_state["state"] == "waiting" and len(jackpot_state["participants"]) >= JACKPOT_MIN_PARTICIPANTS:
             # Minimum players reached - start countdown
             jackpot_state["state"] = "active"
-            jackpot_state["countdown_end"] = (now + timedelta(seconds=JACKPOT_COUNTDOWN_SECONDS)).isoformat()
+            jackpot_state["countdown_end"] = now.timestamp() + JACKPOT_COUNTDOWN_SECONDS
         
+        publish_jackpot_snapshot()
         return {"message": "Joined jackpot", "jackpot_id": jackpot_state["jackpot_id"]}
 
 @api_router.post("/games/jackpot/spin")
@@ -3421,32 +3674,17 @@ async def spin_jackpot(request: Request):
         
         # Check if countdown finished
         if jackpot_state["countdown_end"]:
-            countdown_end = datetime.fromisoformat(jackpot_state["countdown_end"])
-            if countdown_end.tzinfo is None:
-                countdown_end = countdown_end.replace(tzinfo=timezone.utc)
+            countdown_end = jackpot_state["countdown_end"]
             
-            if now < countdown_end:
+            if now.timestamp() < countdown_end:
                 raise HTTPException(status_code=400, detail="Countdown not finished")
         
         jackpot_state["state"] = "spinning"
         
         # Weighted random selection
         total = jackpot_state["total_pot"]
-        rand = random.random() * total
-        cumulative = 0
-        winner = None
-        winner_index = 0
-        
-        for idx, p in enumerate(jackpot_state["participants"]):
-            cumulative += p["bet_amount"]
-            if rand <= cumulative:
-                winner = p
-                winner_index = idx
-                break
-        
-        if not winner:
-            winner = jackpot_state["participants"][-1]
-            winner_index = len(jackpot_state["participants"]) - 1
+        winner_index = pick_jackpot_winner_index(jackpot_state["participants"], total)
+        winner = jackpot_state["participants"][winner_index]
         
         # Store winner_index for frontend animation
         jackpot_state["winner_index"] = winner_index
@@ -3460,49 +3698,10 @@ async def spin_jackpot(request: Request):
         # Record WIN entry for the winner as a separate transaction
         # Win timestamp is 1 millisecond later than bet to ensure correct ordering
         win_timestamp = (now + timedelta(milliseconds=1)).isoformat()
-        for p in jackpot_state["participants"]:
-            is_winner = p["user_id"] == winner["user_id"]
-            win_amount = jackpot_state["total_pot"] if is_winner else 0
-            
-            # Update the pending bet entry to final result
-            await db.bet_history.update_one(
-                {
-                    "user_id": p["user_id"],
-                    "game_type": "jackpot",
-                    "details.jackpot_id": jackpot_state["jackpot_id"],
-                    "result": "pending"
-                },
-                {
-                    "$set": {
-                        "result": "win" if is_winner else "loss",
-                        "win_amount": win_amount,
-                        "net_outcome": round(win_amount - p["bet_amount"], 2),
-                        "details.status": "completed",
-                        "details.total_pot": jackpot_state["total_pot"],
-                        "details.participants": len(jackpot_state["participants"]),
-                        "details.is_winner": is_winner
-                    }
-                }
-            )
-            
-            if is_winner:
-                # Create separate win entry
-                await db.bet_history.insert_one({
-                    "bet_id": f"win_{uuid.uuid4().hex[:12]}",
-                    "user_id": p["user_id"],
-                    "game_type": "jackpot",
-                    "transaction_type": "win",
-                    "amount": jackpot_state["total_pot"],  # Positive for win
-                    "win_amount": jackpot_state["total_pot"],
-                    "timestamp": win_timestamp,  # Slightly later than bet
-                    "details": {
-                        "jackpot_id": jackpot_state["jackpot_id"],
-                        "status": "won",
-                        "total_pot": jackpot_state["total_pot"],
-                        "participants": len(jackpot_state["participants"]),
-                        "bet_amount": p["bet_amount"]
-                    }
-                })
+        await settle_jackpot_bets(
+            jackpot_state["jackpot_id"], jackpot_state["participants"],
+            jackpot_state["total_pot"], winner["user_id"], win_timestamp
+        )
         
         # Record account activity for ALL jackpot participants
         for p in jackpot_state["participants"]:
@@ -3558,20 +3757,21 @@ async def spin_jackpot(request: Request):
             pot_size=jackpot_state["total_pot"]
         )
         
-        # Discord webhook
-        await send_discord_webhook("Jackpot Winner!", {
+        # Discord webhook (fire-and-forget, not worth holding the resolution for)
+        spawn_background_task(send_discord_webhook("Jackpot Winner!", {
             "Winner": winner["username"],
             "Prize": f"{jackpot_state['total_pot']} G",
             "Players": len(jackpot_state["participants"])
-        })
-        
-        winner_data = JackpotParticipant(
-            user_id=winner["user_id"],
-            username=winner["username"],
-            bet_amount=winner["bet_amount"],
-            win_chance=round(winner["bet_amount"] / total * 100, 2),
-            avatar=winner.get("avatar")
-        )
+        }))
+        
+        winner_data = {
+            "user_id": winner["user_id"],
+            "username": winner["username"],
+            "bet_amount": winner["bet_amount"],
+            "win_chance": round(winner["bet_amount"] / total * 100, 2),
+            "avatar": winner.get("avatar"),
+            "jackpot_pattern": None
+        }
         
         jackpot_state["winner"] = winner_data
         jackpot_state["state"] = "complete"
@@ -3590,18 +3790,22 @@ async def spin_jackpot(request: Request):
                     "winner": None,
                     "winner_index": None
                 })
+                publish_jackpot_snapshot()
         
         asyncio.create_task(reset_jackpot())
+        publish_jackpot_snapshot()
         
         return {"winner": winner_data, "total_pot": total}
 
 # ============== USER ENDPOINTS ==============
 
+BET_HISTORY_MAX_PAGE_SIZE = 100  # Largest page the history view requests
+
 @api_router.get("/user/history")
 async def get_bet_history(
     request: Request, 
-    limit: int = 100, 
-    page: int = 1,
+    limit: int = Query(100, ge=1, le=BET_HISTORY_MAX_PAGE_SIZE),
+    page: int = Query(1, ge=1),
     game_type: Optional[str] = None
 ):
     """Get user's bet history - last 7 days, paginated"""
@@ -3620,62 +3824,56 @@ async def get_bet_history(
     # Calculate skip for pagination
     skip = (page - 1) * limit
     
-    # Get total count for pagination info
-    total_count = await db.bet_history.count_documents(query)
+    # Unified amount logic (single source of truth), applied by Mongo to the page only.
+    # Entries may only carry "amount"; admin/quest entries keep their raw amount.
+    is_admin_or_quest = {"$in": ["$transaction_type", ["admin", "quest"]]}
+    normalize_amounts = {
+        # Legacy entries without a bet_id get a stable one derived from their _id
+        "bet_id": {"$ifNull": ["$bet_id", {"$concat": ["bet_", {"$toString": "$_id"}]}]},
+        "bet_amount": {"$switch": {
+            "branches": [
+                {"case": {"$eq": ["$transaction_type", "bet"]},
+                 "then": {"$abs": {"$toDouble": {"$ifNull": ["$amount", {"$ifNull": ["$bet_amount", 0]}]}}}},
+                {"case": {"$eq": ["$transaction_type", "win"]}, "then": 0.0},
+                {"case": is_admin_or_quest, "then": 0.0}
+            ],
+            "default": {"$toDouble": {"$ifNull": ["$bet_amount", 0]}}
+        }},
+        "win_amount": {"$switch": {
+            "branches": [
+                {"case": {"$eq": ["$transaction_type", "win"]},
+                 "then": {"$toDouble": {"$ifNull": ["$amount", {"$ifNull": ["$win_amount", 0]}]}}},
+                {"case": {"$eq": ["$transaction_type", "bet"]}, "then": 0.0},
+                {"case": is_admin_or_quest, "then": 0.0}
+            ],
+            "default": {"$toDouble": {"$ifNull": ["$win_amount", 0]}}
+        }}
+    }
     
-    # Secondary sort in Python to ensure bet comes before win for same timestamp
-    # With reverse=True (descending time), we want bet to appear ABOVE win in the list
-    # Since timestamps are: bet=T, win=T+1ms, descending sort puts win first naturally
-    # We need to group by base timestamp and put bet before win within the group
-    history = await db.bet_history.find(
-        query,
-        {"_id": 0}
-    ).sort([
-        ("timestamp", -1),
-        ("transaction_type", -1)  # BET zuerst
-    ]).skip(skip).limit(limit).to_list(limit)
+    # Newest first; a slot win is stamped 1ms after its bet, so it is listed above it.
+    # transaction_type only breaks ties between entries written in the same instant
+    pipeline = [
+        {"$match": query},
+        {"$sort": {"timestamp": -1, "transaction_type": -1}},
+        {"$skip": skip},
+        {"$limit": limit},
+        {"$addFields": normalize_amounts},
+        # $addFields sees the stage input, so the net needs the amounts computed above
+        {"$addFields": {"net_outcome": {"$cond": [
+            is_admin_or_quest,
+            {"$toDouble": {"$ifNull": ["$amount", {"$ifNull": ["$net_outcome", 0]}]}},
+            {"$subtract": ["$win_amount", "$bet_amount"]}
+        ]}}},
+        {"$addFields": {"amount": "$net_outcome"}},
+        {"$project": {"_id": 0}}
+    ]
+    
+    # Total count for pagination info and the page itself are independent reads
+    total_count, history = await asyncio.gather(
+        db.bet_history.count_documents(query),
+        db.bet_history.aggregate(pipeline).to_list(limit)
+    )
     
-    for item in history:
-
-    # Timestamp konvertieren
-        if isinstance(item.get("timestamp"), str):
-            item["timestamp"] = datetime.fromisoformat(item["timestamp"])
-
-    # Sicherstellen, dass bet_id existiert
-        if "bet_id" not in item:
-            item["bet_id"] = f"bet_{uuid.uuid4().hex[:12]}"
-
-    # Einheitliche Amount-Logik (Single Source of Truth)
-
-        transaction_type = item.get("transaction_type")
-
-        bet_amount = float(item.get("bet_amount", 0))
-        win_amount = float(item.get("win_amount", 0))
-
-# Falls nur amount gespeichert ist
-        if transaction_type == "bet":
-            bet_amount = abs(float(item.get("amount", bet_amount)))
-            win_amount = 0.0
-
-        elif transaction_type == "win":
-            win_amount = float(item.get("amount", win_amount))
-            bet_amount = 0.0
-
-        elif transaction_type in ("admin", "quest"):
-            # Admin/quest: preserve the raw amount directly
-            raw_amount = float(item.get("amount", item.get("net_outcome", 0)))
-            item["bet_amount"] = 0.0
-            item["win_amount"] = 0.0
-            item["net_outcome"] = raw_amount
-            item["amount"] = raw_amount
-            continue
-
-# WICHTIG: Werte setzen, die Frontend braucht
-        item["bet_amount"] = bet_amount
-        item["win_amount"] = win_amount
-        item["net_outcome"] = win_amount - bet_amount
-        item["amount"] = win_amount - bet_amount
-
     return {
         "items": history,
         "total": total_count,
@@ -3735,18 +3933,18 @@ async def get_user_stats(request: Request):
         "by_game": stats_by_game
     }
 
-@api_router.get("/leaderboard", response_model=List[LeaderboardEntry])
-async def get_leaderboard(limit: int = 20):
+async def build_leaderboard(limit: int) -> List[LeaderboardEntry]:
     # Get all users sorted by level (highest first)
     users = await db.users.find(
         {},
         {"_id": 0, "password_hash": 0, "email": 0}
     ).sort("level", -1).limit(limit).to_list(limit)
     
-    # Get stats for each user from aggregation
+    # Get stats for all listed users in one batch
+    stats_by_user = await get_leaderboard_stats([u["user_id"] for u in users])
     leaderboard = []
     for u in users:
-        stats = await get_user_stats_from_history(u["user_id"])
+        stats = stats_by_user[u["user_id"]]
         leaderboard.append({
             "user_id": u["user_id"],
             "username": u["username"],
@@ -3761,11 +3959,13 @@ async def get_leaderboard(limit: int = 20):
     
     return [LeaderboardEntry(**entry) for entry in leaderboard]
 
+@api_router.get("/leaderboard", response_model=List[LeaderboardEntry])
+async def get_leaderboard(limit: int = Query(20, ge=1, le=LEADERBOARD_MAX_LIMIT)):
+    return await cached_payload(f"leaderboard:{limit}", LEADERBOARD_CACHE_TTL_SECONDS, lambda: build_leaderboard(limit))
+
 # ============== EXTENDED LEADERBOARDS ==============
 
-@api_router.get("/leaderboards/balance")
-async def get_balance_leaderboard(limit: int = 25):
-    """Top players by highest balance"""
+async def build_balance_leaderboard(limit: int) -> list:
     users = await db.users.find(
         {},
         {"_id": 0, "password_hash": 0, "email": 0}
@@ -3784,9 +3984,12 @@ async def get_balance_leaderboard(limit: int = 25):
         for idx, u in enumerate(users)
     ]
 
-@api_router.get("/leaderboards/level")
-async def get_level_leaderboard(limit: int = 25):
-    """Top players by highest level (sorted by XP)"""
+@api_router.get("/leaderboards/balance")
+async def get_balance_leaderboard(limit: int = Query(25, ge=1, le=LEADERBOARD_MAX_LIMIT)):
+    """Top players by highest balance"""
+    return await cached_payload(f"leaderboard:balance:{limit}", LEADERBOARD_CACHE_TTL_SECONDS, lambda: build_balance_leaderboard(limit))
+
+async def build_level_leaderboard(limit: int) -> list:
     users = await db.users.find(
         {},
         {"_id": 0, "password_hash": 0, "email": 0}
@@ -3805,9 +4008,12 @@ async def get_level_leaderboard(limit: int = 25):
         for idx, u in enumerate(users)
     ]
 
-@api_router.get("/leaderboards/biggest-wins")
-async def get_biggest_wins_leaderboard(limit: int = 25):
-    """Top 25 biggest single wins across all game modes (wins > 10 G)"""
+@api_router.get("/leaderboards/level")
+async def get_level_leaderboard(limit: int = Query(25, ge=1, le=LEADERBOARD_MAX_LIMIT)):
+    """Top players by highest level (sorted by XP)"""
+    return await cached_payload(f"leaderboard:level:{limit}", LEADERBOARD_CACHE_TTL_SECONDS, lambda: build_level_leaderboard(limit))
+
+async def build_biggest_wins_leaderboard(limit: int) -> list:
     big_wins = await db.big_wins.find({}).sort("win_amount", -1).limit(limit).to_list(limit)
     
     return [
@@ -3831,9 +4037,12 @@ async def get_biggest_wins_leaderboard(limit: int = 25):
         for idx, w in enumerate(big_wins)
     ]
 
-@api_router.get("/leaderboards/biggest-multiplier")
-async def get_biggest_multiplier_leaderboard(limit: int = 25):
-    """Top 25 highest multiplier wins"""
+@api_router.get("/leaderboards/biggest-wins")
+async def get_biggest_wins_leaderboard(limit: int = Query(25, ge=1, le=LEADERBOARD_MAX_LIMIT)):
+    """Top 25 biggest single wins across all game modes (wins > 10 G)"""
+    return await cached_payload(f"leaderboard:biggest-wins:{limit}", LEADERBOARD_CACHE_TTL_SECONDS, lambda: build_biggest_wins_leaderboard(limit))
+
+async def build_biggest_multiplier_leaderboard(limit: int) -> list:
     big_wins = await db.big_wins.find({}).sort("multiplier", -1).limit(limit).to_list(limit)
 
     return [
@@ -3857,9 +4066,12 @@ async def get_biggest_multiplier_leaderboard(limit: int = 25):
         for idx, w in enumerate(big_wins)
     ]
 
-@api_router.get("/live-wins")
-async def get_live_wins(limit: int = 20):
-    """Get recent big wins (> 10 G) for live feed"""
+@api_router.get("/leaderboards/biggest-multiplier")
+async def get_biggest_multiplier_leaderboard(limit: int = Query(25, ge=1, le=LEADERBOARD_MAX_LIMIT)):
+    """Top 25 highest multiplier wins"""
+    return await cached_payload(f"leaderboard:biggest-multiplier:{limit}", LEADERBOARD_CACHE_TTL_SECONDS, lambda: build_biggest_multiplier_leaderboard(limit))
+
+async def build_live_wins(limit: int) -> list:
     big_wins = await db.big_wins.find({}).sort("timestamp", -1).limit(limit).to_list(limit)
     
     return [
@@ -3881,6 +4093,11 @@ async def get_live_wins(limit: int = 20):
         for w in big_wins
     ]
 
+@api_router.get("/live-wins")
+async def get_live_wins(limit: int = Query(20, ge=1, le=LEADERBOARD_MAX_LIMIT)):
+    """Get recent big wins (> 10 G) for live feed"""
+    return await cached_payload(f"live-wins:{limit}", LEADERBOARD_CACHE_TTL_SECONDS, lambda: build_live_wins(limit))
+
 async def record_big_win(user: dict, game_type: str, bet_amount: float, win_amount: float,
                          slot_id: str = None, slot_name: str = None, win_chance: float = None,
                          multiplier: float = 0, winning_symbols: list = None):
@@ -4990,22 +5207,18 @@ async def sell_inventory_items_batch(data: SellItemsBatchRequest, request: Reque
 
 # ============== PRESTIGE SYSTEM ENDPOINTS ==============
 
-@api_router.get("/prestige/shop")
-async def get_prestige_shop():
-    """Get all available prestige cosmetics for purchase (excludes free items)"""
+def build_prestige_shop_payload() -> dict:
+    """Build the prestige shop listing (static, serialized once at import)"""
     cosmetics = []
     
-    for cosmetic_id, template in PRESTIGE_COSMETICS.items():
-        # Only show items that cost something (exclude free basic patterns)
-        if template.get("is_available", True) and template.get("prestige_cost", 0) > 0:
-            cosmetics.append({
-                **template,
-                "tier_display": template.get("tier", "standard").capitalize()
-            })
-    
-    # Sort by type, then by cost
-    type_order = {"name_color": 0, "tag": 1, "jackpot_pattern": 2}
-    cosmetics.sort(key=lambda x: (type_order.get(x["cosmetic_type"], 99), x["prestige_cost"]))
+    # Only show items that cost something (exclude free basic patterns),
+    # already in display order (type, then cost)
+    for cosmetic_id in SHOP_PRESTIGE_COSMETIC_IDS:
+        template = PRESTIGE_COSMETICS[cosmetic_id]
+        cosmetics.append({
+            **template,
+            "tier_display": template["tier"].capitalize()
+        })
     
     return {
         "cosmetics": cosmetics,
@@ -5017,6 +5230,13 @@ async def get_prestige_shop():
         }
     }
 
+PRESTIGE_SHOP_JSON, PRESTIGE_SHOP_ETAG = precompute_json(build_prestige_shop_payload())
+
+@api_router.get("/prestige/shop")
+async def get_prestige_shop(request: Request):
+    """Get all available prestige cosmetics for purchase (excludes free items)"""
+    return static_json_response(request, PRESTIGE_SHOP_JSON, PRESTIGE_SHOP_ETAG)
+
 @api_router.get("/prestige/owned")
 async def get_owned_prestige_cosmetics(request: Request):
     """Get user's owned prestige cosmetics"""
@@ -5032,21 +5252,21 @@ async def get_owned_prestige_cosmetics(request: Request):
     
     # Add free items (prestige_cost = 0) - everyone owns these
     owned = []
-    for cosmetic_id, template in PRESTIGE_COSMETICS.items():
-        if template.get("prestige_cost", 0) == 0 and template.get("is_available", True):
-            # Free item - add if not already in purchased list
-            if cosmetic_id not in purchased_ids:
-                owned.append({
-                    "user_id": user["user_id"],
-                    "cosmetic_id": cosmetic_id,
-                    "cosmetic_type": template.get("cosmetic_type"),
-                    "acquired_at": None,  # Free items have no acquisition date
-                    "display_name": template.get("display_name", cosmetic_id),
-                    "description": template.get("description", ""),
-                    "asset_path": template.get("asset_path"),
-                    "asset_value": template.get("asset_value"),
-                    "tier": "free"
-                })
+    for cosmetic_id in FREE_PRESTIGE_COSMETIC_IDS:
+        # Free item - add if not already in purchased list
+        if cosmetic_id not in purchased_ids:
+            template = PRESTIGE_COSMETICS[cosmetic_id]
+            owned.append({
+                "user_id": user["user_id"],
+                "cosmetic_id": cosmetic_id,
+                "cosmetic_type": template["cosmetic_type"],
+                "acquired_at": None,  # Free items have no acquisition date
+                "display_name": template["display_name"],
+                "description": template["description"],
+                "asset_path": template["asset_path"],
+                "asset_value": template["asset_value"],
+                "tier": "free"
+            })
     
     # Add purchased items with enriched data
     for item in purchased:
@@ -5082,12 +5302,12 @@ async def purchase_prestige_cosmetic(purchase: PrestigePurchaseRequest, request:
     if not template:
         raise HTTPException(status_code=404, detail="Cosmetic not found")
     
-    if not template.get("is_available", True):
+    if not template["is_available"]:
         raise HTTPException(status_code=400, detail="This cosmetic is not available for purchase")
     
     # Check level requirement
     user_doc = await db.users.find_one({"user_id": user["user_id"]})
-    if user_doc.get("level", 1) < template.get("unlock_level", 0):
+    if user_doc.get("level", 1) < template["unlock_level"]:
         raise HTTPException(
             status_code=400, 
             detail=f"You need to be level {template['unlock_level']} to purchase this cosmetic"
@@ -5170,7 +5390,7 @@ async def activate_prestige_cosmetic(activate: PrestigeActivateRequest, request:
     if not template:
         raise HTTPException(status_code=404, detail="Cosmetic template not found")
     
-    is_free_item = template.get("prestige_cost", 0) == 0
+    is_free_item = template["prestige_cost"] == 0
     
     if not is_free_item:
         # For paid items, check database ownership
@@ -6063,7 +6283,7 @@ async def send_chat_message(message_data: ChatMessageCreate, request: Request):
     # Check existing mute (from manual mute or previous auto-mute)
     mute_until = user.get("mute_until")
     if mute_until is not None:
-        if isinstance(mute_until, str):
+        if isinstance(mute_until, str):  # Legacy ISO string
             mute_until = datetime.fromisoformat(mute_until)
         if mute_until.tzinfo is None:
             mute_until = mute_until.replace(tzinfo=timezone.utc)
@@ -6077,7 +6297,7 @@ async def send_chat_message(message_data: ChatMessageCreate, request: Request):
             )
     
     # Run automated moderation checks
-    moderation_result = await moderate_message(user_id, username, message_data.message)
+    moderation_result = await moderate_message(user_id, username, message_data.message, user=user)
     
     if not moderation_result.allowed:
         raise HTTPException(
@@ -6105,13 +6325,15 @@ async def send_chat_message(message_data: ChatMessageCreate, request: Request):
         "user_id": user["user_id"],
         "username": user["username"],
         "message": message_data.message,
-        "timestamp": now.isoformat(),
+        "timestamp": now,
         "name_color": user.get("name_color"),
         "badge": user.get("badge"),
         "active_tag": active_tag_value,
         "active_name_color": active_name_color_value
     }
     
+    # Remember before awaiting the insert so concurrent repeats already see it
+    remember_chat_message(user_id, message_data.message)
     await db.chat_messages.insert_one(message_doc)
     
     return ChatMessage(
@@ -6134,34 +6356,39 @@ async def get_chat_messages(limit: int = 50):
     ).sort("timestamp", -1).limit(limit).to_list(limit)
     
     for msg in messages:
+        # Legacy messages stored the timestamp as an ISO string
         if isinstance(msg["timestamp"], str):
             msg["timestamp"] = datetime.fromisoformat(msg["timestamp"])
+        elif msg["timestamp"].tzinfo is None:
+            msg["timestamp"] = msg["timestamp"].replace(tzinfo=timezone.utc)
     
     return messages[::-1]
 
 # ============== COSMETICS ENDPOINTS ==============
 
+AVAILABLE_COSMETICS_JSON, AVAILABLE_COSMETICS_ETAG = precompute_json({
+    "name_colors": [
+        {"id": "gold", "name": "Gold", "color": "#FFD700", "vip_required": True},
+        {"id": "cyan", "name": "Neon Cyan", "color": "#00F0FF", "vip_required": True},
+        {"id": "purple", "name": "Royal Purple", "color": "#7000FF", "vip_required": True},
+        {"id": "pink", "name": "Hot Pink", "color": "#FF0099", "vip_required": False}
+    ],
+    "badges": [
+        {"id": "vip", "name": "VIP", "icon": "crown", "vip_required": True},
+        {"id": "supporter", "name": "Supporter", "icon": "heart", "vip_required": True},
+        {"id": "veteran", "name": "Veteran", "icon": "star", "level_required": 10},
+        {"id": "whale", "name": "High Roller", "icon": "diamond", "wins_required": 100}
+    ],
+    "frames": [
+        {"id": "gold", "name": "Golden Frame", "vip_required": True},
+        {"id": "neon", "name": "Neon Glow", "vip_required": True},
+        {"id": "diamond", "name": "Diamond Edge", "vip_required": True}
+    ]
+})
+
 @api_router.get("/cosmetics/available")
-async def get_available_cosmetics():
-    return {
-        "name_colors": [
-            {"id": "gold", "name": "Gold", "color": "#FFD700", "vip_required": True},
-            {"id": "cyan", "name": "Neon Cyan", "color": "#00F0FF", "vip_required": True},
-            {"id": "purple", "name": "Royal Purple", "color": "#7000FF", "vip_required": True},
-            {"id": "pink", "name": "Hot Pink", "color": "#FF0099", "vip_required": False}
-        ],
-        "badges": [
-            {"id": "vip", "name": "VIP", "icon": "crown", "vip_required": True},
-            {"id": "supporter", "name": "Supporter", "icon": "heart", "vip_required": True},
-            {"id": "veteran", "name": "Veteran", "icon": "star", "level_required": 10},
-            {"id": "whale", "name": "High Roller", "icon": "diamond", "wins_required": 100}
-        ],
-        "frames": [
-            {"id": "gold", "name": "Golden Frame", "vip_required": True},
-            {"id": "neon", "name": "Neon Glow", "vip_required": True},
-            {"id": "diamond", "name": "Diamond Edge", "vip_required": True}
-        ]
-    }
+async def get_available_cosmetics(request: Request):
+    return static_json_response(request, AVAILABLE_COSMETICS_JSON, AVAILABLE_COSMETICS_ETAG)
 
 # ============== MISC ENDPOINTS ==============
 
@@ -6352,12 +6579,6 @@ async def create_trade(trade_request: TradeCreateRequest, request: Request):
     if recipient["user_id"] == initiator["user_id"]:
         raise HTTPException(status_code=400, detail="You cannot trade with yourself")
     
-    # Validate item counts
-    if len(trade_request.offered_items) > TRADE_MAX_ITEMS_PER_SIDE:
-        raise HTTPException(status_code=400, detail=f"Cannot offer more than {TRADE_MAX_ITEMS_PER_SIDE} items")
-    if len(trade_request.requested_items) > TRADE_MAX_ITEMS_PER_SIDE:
-        raise HTTPException(status_code=400, detail=f"Cannot request more than {TRADE_MAX_ITEMS_PER_SIDE} items")
-    
     # Validate G amounts
     if trade_request.offered_g < 0 or trade_request.requested_g < 0:
         raise HTTPException(status_code=400, detail="G amounts cannot be negative")
@@ -6365,7 +6586,7 @@ async def create_trade(trade_request: TradeCreateRequest, request: Request):
     # Calculate G fee if initiator offers G
     g_fee = 0.0
     if trade_request.offered_g > 0:
-        g_fee = round(trade_request.offered_g * TRADE_G_FEE_PERCENT, 2)
+        g_fee = calculate_trade_g_fee(trade_request.offered_g)
         total_g_needed = trade_request.offered_g + g_fee
         if initiator["balance"] < total_g_needed:
             raise HTTPException(
@@ -6374,7 +6595,7 @@ async def create_trade(trade_request: TradeCreateRequest, request: Request):
             )
     
     # Validate initiator owns offered items
-    initiator_items = []
+    initiator_items: List[TradeOfferItem] = []
     for inv_id in trade_request.offered_items:
         item = await db.user_inventory.find_one({
             "inventory_id": inv_id,
@@ -6393,7 +6614,7 @@ async def create_trade(trade_request: TradeCreateRequest, request: Request):
         })
     
     # Validate recipient owns requested items
-    recipient_items = []
+    recipient_items: List[TradeOfferItem] = []
     for inv_id in trade_request.requested_items:
         item = await db.user_inventory.find_one({
             "inventory_id": inv_id,
@@ -6458,7 +6679,7 @@ async def get_inbound_trades(request: Request):
         {"_id": 0}
     ).sort("created_at", -1).to_list(100)
     
-    return {"trades": trades}
+    return orjson_response({"trades": trades})
 
 @api_router.get("/trades/outbound")
 async def get_outbound_trades(request: Request):
@@ -6470,7 +6691,7 @@ async def get_outbound_trades(request: Request):
         {"_id": 0}
     ).sort("created_at", -1).to_list(100)
     
-    return {"trades": trades}
+    return orjson_response({"trades": trades})
 
 @api_router.get("/trades/completed")
 async def get_completed_trades(request: Request):
@@ -6488,7 +6709,7 @@ async def get_completed_trades(request: Request):
         {"_id": 0}
     ).sort("completed_at", -1).to_list(100)
     
-    return {"trades": trades}
+    return orjson_response({"trades": trades})
 
 @api_router.get("/trades/{trade_id}")
 async def get_trade_detail(trade_id: str, request: Request):
@@ -6503,7 +6724,7 @@ async def get_trade_detail(trade_id: str, request: Request):
     if trade["initiator_id"] != user["user_id"] and trade["recipient_id"] != user["user_id"]:
         raise HTTPException(status_code=403, detail="You are not part of this trade")
     
-    return {"trade": trade}
+    return orjson_response({"trade": trade})
 
 @api_router.post("/trades/{trade_id}/accept")
 async def accept_trade(trade_id: str, request: Request):
@@ -6562,8 +6783,8 @@ async def accept_trade(trade_id: str, request: Request):
     # Validate G balances with fees
     initiator_g = trade["initiator"]["g_amount"]
     recipient_g = trade["recipient"]["g_amount"]
-    initiator_fee = round(initiator_g * TRADE_G_FEE_PERCENT, 2) if initiator_g > 0 else 0
-    recipient_fee = round(recipient_g * TRADE_G_FEE_PERCENT, 2) if recipient_g > 0 else 0
+    initiator_fee = calculate_trade_g_fee(initiator_g)
+    recipient_fee = calculate_trade_g_fee(recipient_g)
     
     if initiator_g > 0:
         total_needed = initiator_g + initiator_fee
@@ -6796,16 +7017,10 @@ async def counter_trade(trade_id: str, counter_request: TradeCounterRequest, req
         await db.trades.delete_one({"trade_id": trade_id})
         raise HTTPException(status_code=400, detail="Other user no longer exists")
     
-    # Validate item counts
-    if len(counter_request.offered_items) > TRADE_MAX_ITEMS_PER_SIDE:
-        raise HTTPException(status_code=400, detail=f"Cannot offer more than {TRADE_MAX_ITEMS_PER_SIDE} items")
-    if len(counter_request.requested_items) > TRADE_MAX_ITEMS_PER_SIDE:
-        raise HTTPException(status_code=400, detail=f"Cannot request more than {TRADE_MAX_ITEMS_PER_SIDE} items")
-    
     # Calculate G fee
     g_fee = 0.0
     if counter_request.offered_g > 0:
-        g_fee = round(counter_request.offered_g * TRADE_G_FEE_PERCENT, 2)
+        g_fee = calculate_trade_g_fee(counter_request.offered_g)
         total_g_needed = counter_request.offered_g + g_fee
         if user["balance"] < total_g_needed:
             raise HTTPException(
@@ -6814,7 +7029,7 @@ async def counter_trade(trade_id: str, counter_request: TradeCounterRequest, req
             )
     
     # Validate current user owns offered items
-    my_items = []
+    my_items: List[TradeOfferItem] = []
     for inv_id in counter_request.offered_items:
         item = await db.user_inventory.find_one({
             "inventory_id": inv_id,
@@ -6833,7 +7048,7 @@ async def counter_trade(trade_id: str, counter_request: TradeCounterRequest, req
         })
     
     # Validate other user owns requested items
-    their_items = []
+    their_items: List[TradeOfferItem] = []
     for inv_id in counter_request.requested_items:
         item = await db.user_inventory.find_one({
             "inventory_id": inv_id,
@@ -7040,6 +7255,13 @@ async def update_quest_progress(user_id: str, quest_type: str, amount: int = 1,
     
     return progress
 
+async def update_slot_spin_quests(user_id: str, total_bet: float, is_win: bool):
+    """Quest progress for one slot spin (sequential: each update rewrites the whole progress dict)"""
+    await update_quest_progress(user_id, "spins", 1, bet_amount=total_bet)
+    await update_quest_progress(user_id, "total_wagered", int(total_bet))
+    if is_win:
+        await update_quest_progress(user_id, "wins", 1, bet_amount=total_bet)
+
 async def add_game_pass_xp(user_id: str, xp_amount: int):
     """Add XP to user's Game Pass and handle level ups"""
     user = await db.users.find_one({"user_id": user_id})
@@ -8058,7 +8280,7 @@ async def admin_mute_user(data: AdminMuteRequest, request: Request):
         result = await db.users.update_one(
             {"username": actual_username},
             {
-                "$set": {"mute_until": mute_until.isoformat()},
+                "$set": {"mute_until": mute_until},
                 "$unset": {"permanently_chat_muted": ""}  # Clear perma flag if doing temp mute
             }
         )
@@ -8106,7 +8328,7 @@ async def admin_ban_user(data: AdminBanRequest, request: Request):
         banned_until = now + timedelta(seconds=data.duration_seconds)
         result = await db.users.update_one(
             {"username": actual_username},
-            {"$set": {"banned_until": banned_until.isoformat()}}
+            {"$set": {"banned_until": banned_until}}
         )
         
         # Invalidate all user sessions
@@ -8284,8 +8506,6 @@ async def admin_reset_user(data: AdminResetUserRequest, request: Request):
     actual_username = user["username"]
 
     # 1. Reset user document fields — preserve identity/auth fields
-    import random as _random
-    default_patterns = ["default_lightblue", "default_pink", "default_red", "default_orange", "default_yellow"]
     await db.users.update_one(
         {"user_id": user_id},
         {"$set": {
@@ -8300,7 +8520,7 @@ async def admin_reset_user(data: AdminResetUserRequest, request: Request):
             "frame": None,
             "active_tag": None,
             "active_name_color": None,
-            "active_jackpot_pattern": _random.choice(default_patterns),
+            "active_jackpot_pattern": secrets.choice(DEFAULT_JACKPOT_PATTERNS),
             "last_wheel_spin": None,
             "galadium_pass_active": False,
             "game_pass_level": 1,
@@ -8714,7 +8934,7 @@ async def admin_get_userinfo(username: str, request: Request):
     is_muted = False
     mute_remaining = 0
     if mute_until:
-        if isinstance(mute_until, str):
+        if isinstance(mute_until, str):  # Legacy ISO string
             mute_until = datetime.fromisoformat(mute_until)
         if mute_until.tzinfo is None:
             mute_until = mute_until.replace(tzinfo=timezone.utc)
@@ -8726,7 +8946,7 @@ async def admin_get_userinfo(username: str, request: Request):
     is_banned = False
     ban_remaining = 0
     if banned_until:
-        if isinstance(banned_until, str):
+        if isinstance(banned_until, str):  # Legacy ISO string
             banned_until = datetime.fromisoformat(banned_until)
         if banned_until.tzinfo is None:
             banned_until = banned_until.replace(tzinfo=timezone.utc)
@@ -8734,6 +8954,12 @@ async def admin_get_userinfo(username: str, request: Request):
             is_banned = True
             ban_remaining = int((banned_until - now).total_seconds())
     
+    created_at = user.get("created_at")
+    if isinstance(created_at, str):  # Legacy ISO string
+        created_at = datetime.fromisoformat(created_at)
+    if created_at and created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    
     return {
         "user_id": user["user_id"],
         "username": user["username"],
@@ -8750,7 +8976,8 @@ async def admin_get_userinfo(username: str, request: Request):
         "mute_remaining_seconds": mute_remaining,
         "is_banned": is_banned,
         "ban_remaining_seconds": ban_remaining,
-        "created_at": user.get("created_at")
+        # Stored as a naive-UTC BSON date; keep the explicit offset in the response
+        "created_at": created_at.isoformat() if created_at else None
     }
 
 @api_router.get("/admin/moderation-logs/{username}")
@@ -8847,7 +9074,7 @@ async def admin_get_moderation_stats(username: str, request: Request):
     mute_remaining = 0
     
     if mute_until:
-        if isinstance(mute_until, str):
+        if isinstance(mute_until, str):  # Legacy ISO string
             mute_until = datetime.fromisoformat(mute_until)
         if mute_until.tzinfo is None:
             mute_until = mute_until.replace(tzinfo=timezone.utc)
@@ -9089,6 +9316,23 @@ async def initialize_item_system():
     """Initialize item system with seed items and shop listings on startup"""
     logger.info("Initializing item system...")
     
+    # Unique indexes enforce registration uniqueness (register relies on DuplicateKeyError)
+    global users_unique_indexes_ready
+    unique_indexes_built = True
+    for field in ("email", "username"):
+        try:
+            await db.users.create_index(field, unique=True)
+        except OperationFailure as e:
+            # Typically existing duplicates. Keep a plain index so register's fallback lookup stays cheap
+            logger.error(f"Could not create unique users.{field} index - register falls back to lookup checks: {e}")
+            await db.users.create_index(field)
+            unique_indexes_built = False
+    users_unique_indexes_ready = unique_indexes_built
+    
+    # OAuth sessions: token lookup, and TTL so Mongo prunes expired sessions itself
+    await db.user_sessions.create_index("session_token")
+    await db.user_sessions.create_index("expires_at", expireAfterSeconds=0)
+    
     # Create indexes for item collections
     await db.items.create_index("item_id", unique=True)
     await db.user_inventory.create_index([("user_id", 1), ("item_id", 1)])
@@ -9100,6 +9344,14 @@ async def initialize_item_system():
     await db.trades.create_index([("initiator_id", 1), ("status", 1)])
     await db.trades.create_index([("recipient_id", 1), ("status", 1)])
     
+    # Create index for the chat feed (spam checks read the in-process recent_chat_messages)
+    await db.chat_messages.create_index([("timestamp", -1)])
+    # Drop the unread per-user chat index from earlier deployments so inserts stop maintaining it
+    try:
+        await db.chat_messages.drop_index([("user_id", 1), ("timestamp", -1)])
+    except OperationFailure:
+        pass  # Never created on this database
+    
     # Create indexes for moderation logs
     await db.moderation_logs.create_index("log_id", unique=True)
     await db.moderation_logs.create_index([("user_id", 1), ("timestamp", -1)])
@@ -9113,6 +9365,21 @@ async def initialize_item_system():
     await db.inventory_value_history.create_index("event_id", unique=True)
     await db.inventory_value_history.create_index([("user_id", 1), ("event_number", -1)])
     
+    # Create index for per-user bet stats (get_user_stats_from_history matches user_id + game_type)
+    await db.bet_history.create_index([("user_id", 1), ("game_type", 1)])
+    # /user/history: user_id + timestamp range, sorted newest first with bet/win tie-break
+    await db.bet_history.create_index([("user_id", 1), ("timestamp", -1), ("transaction_type", -1)])
+    # settle_jackpot_bets resolves a round's pending entries by jackpot id; only jackpot rows are indexed
+    await db.bet_history.create_index(
+        [("details.jackpot_id", 1), ("result", 1)],
+        partialFilterExpression={"game_type": "jackpot"}
+    )
+    
+    # Create indexes for the big win leaderboards (each sorts the whole collection by one field)
+    await db.big_wins.create_index([("win_amount", -1)])
+    await db.big_wins.create_index([("multiplier", -1)])
+    await db.big_wins.create_index([("timestamp", -1)])
+    
     # Create indexes for account activity history
     await db.account_activity_history.create_index("event_id", unique=True)
     await db.account_activity_history.create_index([("user_id", 1), ("event_number", -1)])
@@ -9181,6 +9448,81 @@ async def initialize_item_system():
     
     logger.info("Item system initialized successfully")
 
+# User fields that used to be written as ISO strings and are now stored as BSON dates
+USER_DATE_FIELDS = ("banned_until", "created_at", "last_wheel_spin")
+USER_TIMESTAMPS_MIGRATION_ID = "user_timestamps_to_dates"
+
+@app.on_event("startup")
+async def migrate_user_timestamps():
+    """Convert legacy ISO-string user timestamps to BSON dates so readers never parse them.
+    
+    One-off: recorded in db.migrations once every value converted, so later boots skip
+    the unindexed scans. Unparseable values are logged and left for an operator to fix.
+    """
+    if await db.migrations.find_one({"_id": USER_TIMESTAMPS_MIGRATION_ID}):
+        return
+    
+    failed = 0
+    for field in USER_DATE_FIELDS:
+        updates = []
+        async for user in db.users.find({field: {"$type": "string"}}, {"_id": 0, "user_id": 1, field: 1}):
+            try:
+                value = datetime.fromisoformat(user[field])
+            except ValueError:
+                failed += 1
+                logger.error(f"Cannot migrate users.{field} for {user['user_id']}: {user[field]!r}")
+                continue
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            updates.append(UpdateOne({"user_id": user["user_id"]}, {"$set": {field: value}}))
+        if updates:
+            await db.users.bulk_write(updates, ordered=False)
+            logger.info(f"Migrated {len(updates)} users.{field} values to dates")
+    
+    if failed:
+        logger.error(f"{failed} user timestamps could not be migrated - will retry on next startup")
+        return
+    await db.migrations.insert_one({"_id": USER_TIMESTAMPS_MIGRATION_ID, "completed_at": datetime.now(timezone.utc)})
+
+SESSION_EXPIRY_MIGRATION_ID = "user_sessions_expires_at_to_dates"
+
+@app.on_event("startup")
+async def migrate_session_expiry():
+    """Convert legacy ISO-string user_sessions.expires_at to BSON dates.
+    
+    The TTL index only prunes date values, so string-typed sessions would live forever.
+    One-off like migrate_user_timestamps; sessions whose expiry cannot be parsed are
+    unusable anyway and are deleted instead of converted.
+    """
+    if await db.migrations.find_one({"_id": SESSION_EXPIRY_MIGRATION_ID}):
+        return
+    
+    ops = []
+    async for session in db.user_sessions.find({"expires_at": {"$type": "string"}}, {"_id": 1, "expires_at": 1}):
+        try:
+            value = datetime.fromisoformat(session["expires_at"])
+        except ValueError:
+            ops.append(DeleteOne({"_id": session["_id"]}))
+            continue
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        ops.append(UpdateOne({"_id": session["_id"]}, {"$set": {"expires_at": value}}))
+    if ops:
+        result = await db.user_sessions.bulk_write(ops, ordered=False)
+        logger.info(f"Migrated {result.modified_count} user_sessions.expires_at values to dates, deleted {result.deleted_count} unparseable sessions")
+    
+    await db.migrations.insert_one({"_id": SESSION_EXPIRY_MIGRATION_ID, "completed_at": datetime.now(timezone.utc)})
+
+@app.on_event("startup")
+async def warm_up_password_hashing():
+    """Load passlib's bcrypt backend at startup so the first login doesn't pay for it"""
+    await asyncio.to_thread(pwd_context.hash, "warmup")
+    logger.info(f"Password hashing ready (bcrypt backend: {pwd_context.handler('bcrypt').get_backend()})")
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
+
+@app.on_event("shutdown")
+async def shutdown_http_client():
+    await HTTP_CLIENT.aclose()
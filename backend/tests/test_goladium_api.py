@@ -11,6 +11,7 @@ BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
 
 # Test credentials
 TEST_EMAIL = "test@test.com"
+TEST_USERNAME = "test"
 TEST_PASSWORD = "test"
 
 
@@ -325,6 +326,85 @@ class TestProfile:
         print(f"✓ User stats - Spins: {data['total_spins']}, Wins: {data['total_wins']}, Net Profit: {data['net_profit']}G")
 
 
+class TestHistory:
+    """Paginated /user/history tests (amounts normalized server-side)"""
+    
+    @pytest.fixture
+    def auth_token(self):
+        """Get authentication token"""
+        response = requests.post(f"{BASE_URL}/api/auth/login", json={
+            "username": TEST_USERNAME,
+            "password": TEST_PASSWORD
+        })
+        return response.json()["access_token"]
+    
+    def test_history_page_fields(self, auth_token):
+        """Test history page shape and per-entry amount fields"""
+        response = requests.get(f"{BASE_URL}/api/user/history?limit=20&page=1", headers={
+            "Authorization": f"Bearer {auth_token}"
+        })
+        assert response.status_code == 200, f"History failed: {response.text}"
+        
+        data = response.json()
+        assert "items" in data
+        assert data["page"] == 1
+        assert data["limit"] == 20
+        assert data["total_pages"] == (data["total"] + 19) // 20
+        assert len(data["items"]) <= 20
+        
+        for item in data["items"]:
+            assert "bet_id" in item
+            assert "_id" not in item
+            assert isinstance(item["bet_amount"], float)
+            assert isinstance(item["win_amount"], float)
+            assert isinstance(item["net_outcome"], float)
+            assert item["amount"] == item["net_outcome"]
+            if item.get("transaction_type") not in ("admin", "quest"):
+                assert abs(item["net_outcome"] - (item["win_amount"] - item["bet_amount"])) < 0.001
+        
+        # Newest first
+        timestamps = [item["timestamp"] for item in data["items"]]
+        assert timestamps == sorted(timestamps, reverse=True)
+        
+        print(f"✓ History page returned - {len(data['items'])} of {data['total']} entries")
+    
+    def test_history_lists_slot_spin(self, auth_token):
+        """Test a slot spin shows up as bet (and win) entries at the top of the history"""
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        spin = requests.post(f"{BASE_URL}/api/games/slot/spin", headers=headers, json={
+            "bet_per_line": 0.01,
+            "active_lines": [1],
+            "slot_id": "classic"
+        })
+        assert spin.status_code == 200, f"Spin failed: {spin.text}"
+        spin_data = spin.json()
+        
+        response = requests.get(f"{BASE_URL}/api/user/history?limit=2&game_type=slot", headers=headers)
+        assert response.status_code == 200
+        items = response.json()["items"]
+        
+        # The win is stamped after its bet, so it is listed first
+        if spin_data["win_amount"] > 0:
+            assert items[0]["transaction_type"] == "win"
+            assert abs(items[0]["win_amount"] - spin_data["win_amount"]) < 0.01
+            assert items[1]["transaction_type"] == "bet"
+        else:
+            assert items[0]["transaction_type"] == "bet"
+        bet = next(item for item in items if item["transaction_type"] == "bet")
+        assert abs(bet["bet_amount"] - spin_data["total_bet"]) < 0.01
+        assert bet["win_amount"] == 0.0
+        
+        print(f"✓ Slot spin recorded in history - Bet: {bet['bet_amount']}G")
+    
+    def test_history_rejects_invalid_paging(self, auth_token):
+        """Test out-of-range limit/page values are rejected"""
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        for params in ("limit=0", "limit=101", "page=0"):
+            response = requests.get(f"{BASE_URL}/api/user/history?{params}", headers=headers)
+            assert response.status_code == 422, f"{params} returned {response.status_code}"
+        print("✓ Invalid history paging correctly rejected")
+
+
 class TestLeaderboard:
     """Leaderboard endpoint tests"""
     
@@ -345,6 +425,31 @@ class TestLeaderboard:
             assert "net_profit" in entry
         
         print(f"✓ Leaderboard returned - {len(data)} entries")
+    
+    def test_leaderboard_stats_match_profile(self):
+        """Test batched leaderboard stats match the per-user stats from /auth/me"""
+        login_response = requests.post(f"{BASE_URL}/api/auth/login", json={
+            "username": TEST_USERNAME,
+            "password": TEST_PASSWORD
+        })
+        token = login_response.json()["access_token"]
+        me = requests.get(f"{BASE_URL}/api/auth/me", headers={
+            "Authorization": f"Bearer {token}"
+        }).json()
+        
+        # Let any cached leaderboard from earlier tests expire
+        time.sleep(3.5)
+        response = requests.get(f"{BASE_URL}/api/leaderboard?limit=100")
+        assert response.status_code == 200
+        
+        entry = next((e for e in response.json() if e["user_id"] == me["user_id"]), None)
+        if entry is None:
+            pytest.skip("Test user not in the top 100 by level")
+        assert entry["total_wins"] == me["total_wins"]
+        assert abs(entry["total_wagered"] - me["total_wagered"]) < 0.01
+        assert abs(entry["net_profit"] - me["net_profit"]) < 0.01
+        
+        print(f"✓ Leaderboard stats match profile - Wins: {entry['total_wins']}, Wagered: {entry['total_wagered']}G")
 
 
 class TestChat: